@@ -1,63 +1,1145 @@
 #!/usr/bin/env python3
 
 import argparse
+from collections import Counter
 from copy import deepcopy
+from dataclasses import dataclass, replace
+from fnmatch import fnmatch
 from glob import glob
 from importlib import import_module
-from prettytable import PrettyTable
+import json
+import math
+import os
+import statistics
+import sys
+import threading
 import timeit
-from typing import List
+import traceback
+from typing import Any, Dict, List, Optional, Tuple
 
 
-def run_part(mod, part_num: int, input_data):
-    part_name = f'part{part_num}'
-    f = getattr(mod, part_name)
+@dataclass
+class Options:
+    runs: int = 1
+    warmup: int = 0
+    cache_dir: Optional[str] = None
+    cache_size: int = 256 * 1024 * 1024
+    profile_dir: Optional[str] = None
+    profile_top: int = 20
+    mem: bool = False
+    timeout: Optional[float] = None
+    max_mem: Optional[int] = None
+    parallel_parts: bool = False
+    counters: bool = False
+
+    def isolated(self) -> bool:
+        return self.timeout is not None or self.max_mem is not None
+
+
+@dataclass(frozen=True)
+class Failed:
+    # Stands in for the result of a part that was killed or crashed in its child process
+    reason: str
+
+    def __str__(self):
+        return self.reason
+
+
+FAILURES = ('TIMEOUT', 'OOM', 'ERROR', 'CRASHED')
+
+
+@dataclass
+class Timing:
+    problem: str
+    input_file: str
+    name: str
+    result: Any
+    times: List[float]
+    peak_traced: Optional[int] = None
+    peak_rss: Optional[int] = None
+    counters: Optional[Dict[str, float]] = None
+
+    def record_memory(self, peaks: Optional[Tuple[int, int]]):
+        if peaks is None:
+            return
+        traced, rss = peaks
+        self.peak_traced = max(traced, self.peak_traced or 0)
+        self.peak_rss = max(rss, self.peak_rss or 0)
+
+    def stats(self) -> Dict[str, float]:
+        ordered = sorted(self.times)
+        # Nearest-rank percentile, so p95 is always an observed time
+        p95_idx = max(0, math.ceil(0.95 * len(ordered)) - 1)
+        return {
+            'min': ordered[0],
+            'median': statistics.median(ordered),
+            'p95': ordered[p95_idx],
+            'stddev': statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+        }
+
+
+def problem_name(mod) -> str:
+    return mod.__name__.split('.')[-1]
+
+
+def time_call(f, *args):
     start = timeit.default_timer()
-    result = f(input_data)
-    time_taken = timeit.default_timer() - start 
-    return (part_name, result, time_taken)
+    result = f(*args)
+    return result, timeit.default_timer() - start
+
+
+def current_rss() -> Optional[int]:
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return None
+
+
+class RssSampler:
+    # Polls the resident set size while a call runs and keeps the highest value seen
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0
+        self.stopped = threading.Event()
+
+    def __enter__(self):
+        self.sample()
+        self.thread = threading.Thread(target=self.sample_loop, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+        self.sample()
+
+    def sample(self):
+        rss = current_rss()
+        if rss is None:
+            import resource
+            # No /proc here, so fall back to the process-wide high-water mark (KiB on Linux)
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        self.peak = max(self.peak, rss)
+
+    def sample_loop(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+
+def measure_call(opts: Options, f, *args):
+    # Returns the result, the time taken and, with opts.mem, the peak traced and RSS bytes
+    if not opts.mem:
+        return (*time_call(f, *args), None)
+    import tracemalloc
+    tracemalloc.start()
+    try:
+        with RssSampler() as sampler:
+            result, time_taken = time_call(f, *args)
+        _, peak_traced = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, time_taken, (peak_traced, sampler.peak)
+
+
+def counted_call(opts: Options, f, *args):
+    # measure_call, plus whatever the problem counted with problems.utils.metrics while it ran
+    if not opts.counters:
+        return (*measure_call(opts, f, *args), None)
+    from problems.utils import metrics
+    metrics.reset()
+    metrics.enabled = True
+    try:
+        measured = measure_call(opts, f, *args)
+    finally:
+        metrics.enabled = False
+    return (*measured, metrics.snapshot())
+
+
+def address_space() -> int:
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return 0
+
+
+def isolated_child(conn, max_mem: Optional[int], f, args):
+    if max_mem is not None:
+        import resource
+        # The child starts out with the harness's own mappings, so the limit is on top of those
+        limit = address_space() + max_mem
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    try:
+        conn.send(('ok', f(*args)))
+    except MemoryError:
+        conn.send(('OOM', None))
+    except BaseException:
+        conn.send(('ERROR', traceback.format_exc()))
+
+
+def start_isolated(opts: Options, f, *args):
+    # Starts the call in a forked child so it can be killed after opts.timeout seconds or capped
+    # at opts.max_mem bytes. The child inherits its arguments, so only the result is pickled.
+    import multiprocessing
+    ctx = multiprocessing.get_context('fork')
+    receiver, sender = ctx.Pipe(duplex=False)
+    start = timeit.default_timer()
+    proc = ctx.Process(target=isolated_child, args=(sender, opts.max_mem, f, args), daemon=True)
+    proc.start()
+    sender.close()
+    return proc, receiver, start
+
+
+def finish_isolated(opts: Options, proc, receiver, start: float):
+    # Returns the child's result, or Failed if it had to be killed or crashed, and the time it took
+    remaining = None if opts.timeout is None else max(0.0, start + opts.timeout - timeit.default_timer())
+    try:
+        status, payload = receiver.recv() if receiver.poll(remaining) else ('TIMEOUT', None)
+    except EOFError:
+        status, payload = 'DIED', None
+    elapsed = timeit.default_timer() - start
+    receiver.close()
+
+    if proc.is_alive() and status == 'TIMEOUT':
+        proc.terminate()
+        proc.join(1)
+    if proc.is_alive():
+        proc.kill()
+    proc.join()
+
+    if status == 'ok':
+        return payload, elapsed
+    if status == 'DIED':
+        # Killed from outside without a word, which with a memory cap is almost always the OOM killer
+        status = 'OOM' if opts.max_mem is not None and proc.exitcode < 0 else 'CRASHED'
+        if status == 'CRASHED':
+            print(f'Part exited with code {proc.exitcode}', file=sys.stderr)
+    elif status == 'ERROR':
+        print(payload, file=sys.stderr)
+    return Failed(status), elapsed
+
+
+def isolated_call(opts: Options, f, *args):
+    result, elapsed = finish_isolated(opts, *start_isolated(opts, counted_call, opts, f, *args))
+    return (result, elapsed, None, None) if isinstance(result, Failed) else result
+
+
+def run_part(mod, part_num: int, input_data, opts: Options):
+    part_name = f'part{part_num}'
+    call = isolated_call if opts.isolated() else counted_call
+    result, time_taken, peaks, counters = call(opts, getattr(mod, part_name), input_data)
+    return (part_name, result, time_taken, peaks, counters)
+
+
+def mutates_input(mod) -> bool:
+    # Parsed input is treated as read-only and shared between parts and runs,
+    # unless the problem declares MUTATES_INPUT = True
+    return getattr(mod, 'MUTATES_INPUT', False)
+
+
+def copy_input(mod, parsed_input):
+    if not mutates_input(mod):
+        return parsed_input, 0.0
+    return time_call(deepcopy, parsed_input)
+
+
+def bench_part(mod, input_file: str, part_num: int, parsed_input, opts: Options,
+               owned: bool = False) -> List[Timing]:
+    # With owned, nothing else will use parsed_input after this (as in a forked worker),
+    # so the last run can have it without a copy
+    part_timing = Timing(problem_name(mod), input_file, f'part{part_num}', None, [])
+    for _ in range(opts.warmup):
+        _, result, time_taken, _, _ = run_part(mod, part_num, copy_input(mod, parsed_input)[0], opts)
+        if isinstance(result, Failed):
+            part_timing.result = result
+            part_timing.times.append(time_taken)
+            return [part_timing]
+    copy_times = []
+    for n in range(opts.runs):
+        if owned and n == opts.runs - 1:
+            part_input = parsed_input
+        else:
+            part_input, copy_time = copy_input(mod, parsed_input)
+            copy_times.append(copy_time)
+        _, part_timing.result, time_taken, peaks, counters = run_part(mod, part_num, part_input, opts)
+        part_timing.times.append(time_taken)
+        part_timing.record_memory(peaks)
+        # Counts should be the same every run, so the last run's stand for them all
+        part_timing.counters = counters
+        # No point timing it again once it's been killed
+        if isinstance(part_timing.result, Failed):
+            break
+
+    results = []
+    if mutates_input(mod) and len(copy_times) > 0:
+        results.append(Timing(problem_name(mod), input_file, 'copy', '', copy_times))
+    results.append(part_timing)
+    return results
+
+
+def combine_timings(results: List[Timing]) -> List[Timing]:
+    # Copies are made per part, so add them up into a single row per input.
+    # Pool workers each read and parse the input for themselves; keep the first.
+    combined = []
+    seen = {}
+    for r in results:
+        key = (r.problem, r.input_file, r.name)
+        if r.name.startswith('part'):
+            combined.append(r)
+        elif key not in seen:
+            seen[key] = replace(r, times=r.times.copy())
+            combined.append(seen[key])
+        elif r.name == 'copy':
+            seen[key].times = [a + b for a, b in zip(seen[key].times, r.times)]
+    return combined
+
+
+def input_mode(mod) -> str:
+    # Problems get their input as a list of lines unless they declare INPUT_MODE as 'stream'
+    # (a lazy iterator over the lines) or 'mmap' (the file's bytes, memory mapped)
+    return getattr(mod, 'INPUT_MODE', 'lines')
+
+
+def heavy_imports(mod) -> Tuple[str, ...]:
+    # Modules a problem imports lazily (so running one problem doesn't pay for another's dependencies),
+    # declared as HEAVY_IMPORTS so that --serve can import them before taking requests
+    return getattr(mod, 'HEAVY_IMPORTS', ())
+
+
+def stream_lines(input_file: str):
+    with open(input_file, 'r') as f:
+        yield from f
+
+
+def map_file(input_file: str):
+    import mmap
+    with open(input_file, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # Empty files can't be mapped
+            return b''
+        # The mapping keeps its own handle, so the file can be closed
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
 
 
-def run(input_file: str, parts: List[int]):
+def read_input(input_file: str, mode: str = 'lines'):
+    # Streamed and mapped inputs are only read as they're parsed, so their reading shows up in the parse time
+    if mode == 'stream':
+        return stream_lines(input_file)
+    if mode == 'mmap':
+        return map_file(input_file)
     with open(input_file, 'r') as f:
-        base_input = f.readlines()
+        return f.readlines()
+
+
+def input_from_lines(mod, lines: List[str]):
+    # For inputs that are already in memory, such as generated ones or those sent to the server
+    return ''.join(lines).encode() if input_mode(mod) == 'mmap' else lines
+
+
+def hash_file(path: str) -> str:
+    # In blocks, so hashing a huge input doesn't need it all in memory
+    import hashlib
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def module_source_hash(mod) -> str:
+    # Parsers lean on the shared helpers, so a change to those counts too
+    import hashlib
+    utils = import_module('problems.utils')
+    h = hashlib.sha256()
+    for path in [mod.__file__, utils.__file__]:
+        h.update(hash_file(path).encode())
+    return h.hexdigest()
+
+
+def parse_cache_path(mod, input_file: str, cache_dir: str) -> str:
+    import hashlib
+    key = hashlib.sha256(f'{hash_file(input_file)}:{module_source_hash(mod)}'.encode()).hexdigest()
+    return os.path.join(cache_dir, f'{problem_name(mod)}-{key}.pickle')
+
+
+def load_cached_parse(path: str):
+    import pickle
+    with open(path, 'rb') as f:
+        parsed_input = pickle.load(f)
+    # Bump the modification time so eviction treats it as recently used
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+    return parsed_input
+
+
+def store_cached_parse(path: str, parsed_input, max_size: int):
+    import pickle
+    try:
+        data = pickle.dumps(parsed_input, protocol=pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, AttributeError, TypeError):
+        # Not everything a parser returns can be pickled; just don't cache it
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    evict_cache(os.path.dirname(path), max_size)
+
+
+def evict_cache(cache_dir: str, max_size: int):
+    # Least recently used entries go first until everything fits. Other workers sharing the cache
+    # may be evicting at the same time, so entries can vanish at any point.
+    entries = []
+    for name in os.listdir(cache_dir):
+        if not name.endswith('.pickle'):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_size:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def parse_with_cache(mod, input_file: str, opts: Options):
+    cache_path = parse_cache_path(mod, input_file, opts.cache_dir)
+    try:
+        return load_cached_parse(cache_path), 'cache hit'
+    except FileNotFoundError:
+        # Either never cached, or evicted by another worker since
+        pass
+    parsed_input = mod.parse_input(read_input(input_file, input_mode(mod)))
+    store_cached_parse(cache_path, parsed_input, opts.cache_size)
+    return parsed_input, 'cache miss'
+
+
+def read_and_parse(mod, input_file: str, opts: Options) -> Tuple[Any, List[Timing]]:
+    if opts.cache_dir:
+        # The cache has to hash the whole file to find an entry, so reading is folded into parsing.
+        # The status is the first call's, which says whether the cache already had the input.
+        statuses = []
+        parse_times = []
+        for _ in range(opts.warmup):
+            statuses.append(parse_with_cache(mod, input_file, opts)[1])
+        for _ in range(opts.runs):
+            (parsed_input, status), parse_time = time_call(parse_with_cache, mod, input_file, opts)
+            statuses.append(status)
+            parse_times.append(parse_time)
+        return parsed_input, [Timing(problem_name(mod), input_file, 'parse', statuses[0], parse_times)]
+
+    for _ in range(opts.warmup):
+        mod.parse_input(read_input(input_file, input_mode(mod)))
+    read_timing = Timing(problem_name(mod), input_file, 'read', '', [])
+    parse_timing = Timing(problem_name(mod), input_file, 'parse', '', [])
+    for _ in range(opts.runs):
+        base_input, read_time = time_call(read_input, input_file, input_mode(mod))
+        parsed_input, parse_time, peaks = measure_call(opts, mod.parse_input, base_input)
+        read_timing.times.append(read_time)
+        parse_timing.times.append(parse_time)
+        parse_timing.record_memory(peaks)
+
+    return parsed_input, [read_timing, parse_timing]
+
+
+class ResultStore:
+    # Answers and their last timings, keyed by problem, part, input contents and problem source,
+    # so an unchanged problem on an unchanged input needn't be solved again
+
+    def __init__(self, path: str, max_entries: int):
+        import sqlite3
+        self.db = sqlite3.connect(path)
+        self.db.execute('CREATE TABLE IF NOT EXISTS results ('
+                        'problem TEXT, part TEXT, input_hash TEXT, source_hash TEXT, '
+                        'result TEXT, times TEXT, used REAL, '
+                        'PRIMARY KEY (problem, part, input_hash, source_hash))')
+        self.max_entries = max_entries
+        self.hashes = {}
+
+    def key(self, problem: str, input_file: str, part: str) -> Tuple[str, str, str, str]:
+        if (problem, input_file) not in self.hashes:
+            mod = import_module(f'problems.{problem}')
+            self.hashes[(problem, input_file)] = (hash_file(input_file), module_source_hash(mod))
+        return (problem, part, *self.hashes[(problem, input_file)])
+
+    def lookup(self, problem: str, input_file: str, parts: List[int]) -> Dict[int, Timing]:
+        import time
+        found = {}
+        for part in parts:
+            key = self.key(problem, input_file, f'part{part}')
+            row = self.db.execute('SELECT result, times FROM results WHERE problem = ? AND part = ? '
+                                  'AND input_hash = ? AND source_hash = ?', key).fetchone()
+            if row is None:
+                continue
+            found[part] = Timing(problem, input_file, f'part{part}', row[0], json.loads(row[1]))
+            self.db.execute('UPDATE results SET used = ? WHERE problem = ? AND part = ? '
+                            'AND input_hash = ? AND source_hash = ?', (time.time(), *key))
+        self.db.commit()
+        return found
+
+    def save(self, results: List[Timing]):
+        import time
+        for r in results:
+            if not r.name.startswith('part') or isinstance(r.result, Failed):
+                continue
+            self.db.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)',
+                            (*self.key(r.problem, r.input_file, r.name), str(r.result), json.dumps(r.times),
+                             time.time()))
+        # Least recently used entries go first
+        self.db.execute('DELETE FROM results WHERE rowid NOT IN '
+                        '(SELECT rowid FROM results ORDER BY used DESC LIMIT ?)', (self.max_entries,))
+        self.db.commit()
+
+    def verify(self, results: List[Timing]) -> Tuple[List[Timing], List[str]]:
+        # Splits the results into those that agree with (or are new to) the store, and mismatches
+        agreed = []
+        mismatches = []
+        for r in results:
+            if r.name.startswith('part') and not isinstance(r.result, Failed):
+                part = int(r.name[len('part'):])
+                stored = self.lookup(r.problem, r.input_file, [part]).get(part)
+                if stored is not None and stored.result != str(r.result):
+                    mismatches.append(f'{r.problem} {r.name} on {r.input_file}: got {r.result}, '
+                                      f'stored {stored.result}')
+                    continue
+            agreed.append(r)
+        return agreed, mismatches
+
+
+class StackSampler:
+    # Samples the calling thread's stack on a timer, for flamegraph-style collapsed stacks.
+    # cProfile only keeps caller/callee pairs, so it can't produce these by itself.
+
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.samples = Counter()
+        self.stopped = threading.Event()
+
+    def __enter__(self):
+        self.target_thread = threading.get_ident()
+        self.root_frame = sys._getframe(1)
+        self.prev_switch_interval = sys.getswitchinterval()
+        # Let the sampler get the GIL back about as often as it wants to sample
+        sys.setswitchinterval(self.interval)
+        self.thread = threading.Thread(target=self.sample_loop, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+        sys.setswitchinterval(self.prev_switch_interval)
+
+    def sample_loop(self):
+        import cProfile
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.target_thread)
+            stack = []
+            while frame is not None and frame is not self.root_frame:
+                code = frame.f_code
+                if code.co_filename != cProfile.__file__:
+                    stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if len(stack) > 0:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def write_collapsed(self, path: str):
+        with open(path, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f'{stack} {count}\n')
+
+
+def profile_call(opts: Options, label: str, f, *args):
+    import cProfile
+    import pstats
+    profiler = cProfile.Profile()
+    with StackSampler() as sampler:
+        start = timeit.default_timer()
+        result = profiler.runcall(f, *args)
+        time_taken = timeit.default_timer() - start
+
+    print(f'Profile of {label}:')
+    pstats.Stats(profiler, stream=sys.stdout).sort_stats('cumulative').print_stats(opts.profile_top)
+    os.makedirs(opts.profile_dir, exist_ok=True)
+    collapsed_path = os.path.join(opts.profile_dir, f'{label}.folded')
+    sampler.write_collapsed(collapsed_path)
+    print(f'Collapsed stacks written to {collapsed_path}')
+    return result, time_taken
+
 
-    parsed_input = mod.parse_input(base_input)
+def run_profiled(mod, input_file: str, parts: List[int], opts: Options) -> List[Timing]:
+    # A single profiled run of each phase; profiler overhead makes repeats meaningless
+    label = f'{problem_name(mod)}-{os.path.splitext(os.path.basename(input_file))[0]}'
+    base_input, read_time = time_call(read_input, input_file, input_mode(mod))
+    parsed_input, parse_time = profile_call(opts, f'{label}-parse', mod.parse_input, base_input)
+    results = [
+        Timing(problem_name(mod), input_file, 'read', '', [read_time]),
+        Timing(problem_name(mod), input_file, 'parse', '', [parse_time]),
+    ]
 
+    for part in parts:
+        part_input, copy_time = copy_input(mod, parsed_input)
+        if mutates_input(mod):
+            results.append(Timing(problem_name(mod), input_file, 'copy', '', [copy_time]))
+        part_name = f'part{part}'
+        result, time_taken = profile_call(opts, f'{label}-{part_name}', getattr(mod, part_name), part_input)
+        results.append(Timing(problem_name(mod), input_file, part_name, result, [time_taken]))
+
+    return combine_timings(results)
+
+
+def bench_parts_forked(mod, input_file: str, parts: List[int], parsed_input, opts: Options) -> List[Timing]:
+    # One forked worker per part, each with a copy-on-write view of the parsed input rather than a
+    # deep copy. Any timeout or memory cap applies to each worker as a whole.
+    worker_opts = replace(opts, timeout=None, max_mem=None)
+    workers = [start_isolated(opts, bench_part, mod, input_file, part, parsed_input, worker_opts, True)
+               for part in parts]
     results = []
+    for part, worker in zip(parts, workers):
+        timings, elapsed = finish_isolated(opts, *worker)
+        if isinstance(timings, Failed):
+            timings = [Timing(problem_name(mod), input_file, f'part{part}', timings, [elapsed])]
+        results.extend(timings)
+    return results
+
+
+def run(mod, input_file: str, parts: List[int], opts: Options, prefetched=None) -> List[Timing]:
+    if opts.profile_dir:
+        return run_profiled(mod, input_file, parts, opts)
+
+    parsed_input, results = prefetched or read_and_parse(mod, input_file, opts)
+
+    if opts.parallel_parts and len(parts) > 1:
+        print(f"Executing parts {', '.join(map(str, parts))} in parallel... ")
+        results.extend(bench_parts_forked(mod, input_file, parts, parsed_input, opts))
+        print('[Done]')
+        return combine_timings(results)
+
     for part in parts:
-        part_input = deepcopy(parsed_input)
         print(f'Executing part {part}... ')
-        results.append(run_part(mod, part, part_input))
+        results.extend(bench_part(mod, input_file, part, parsed_input, opts))
         print('[Done]')
 
-    return results
+    return combine_timings(results)
+
+
+def prefetch_input(problem: str, input_file: str, opts: Options) -> Tuple[Any, List[Timing]]:
+    # Entry point for the prefetch worker
+    return read_and_parse(import_module(f'problems.{problem}'), input_file, opts)
+
+
+def prefetch_inputs(mod, input_files: List[str], opts: Options):
+    # Yields each input file with its parsed input and parse timings, in order. While the caller solves
+    # one input, the next is read and parsed in a background process (a thread would just fight over the GIL).
+    # Profiles parse for themselves, and benchmarks shouldn't share the CPU with a parse.
+    if len(input_files) < 2 or opts.profile_dir or opts.runs > 1:
+        for input_file in input_files:
+            yield input_file, None
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=1, initializer=init_problem_worker, initargs=(problem_name(mod),)) as executor:
+        # Parse the first input here while the worker starts up on the second
+        pending = None
+        for k, input_file in enumerate(input_files):
+            next_pending = None
+            if k + 1 < len(input_files):
+                next_pending = executor.submit(prefetch_input, problem_name(mod), input_files[k + 1], opts)
+            try:
+                prefetched = pending.result() if pending else read_and_parse(mod, input_file, opts)
+            except Exception:
+                # Most likely a parsed input that can't be pickled back; parse it here instead, so
+                # that a genuine parse error is raised where it would have been without prefetching
+                prefetched = read_and_parse(mod, input_file, opts)
+            yield input_file, prefetched
+            pending = next_pending
+
+
+def generated_label(size: int) -> str:
+    return f'generated N={size}'
+
+
+def run_scaled(mod, sizes: List[int], parts: List[int], seed: int, opts: Options) -> List[Timing]:
+    import random
+    # Without a warm-up, first-call costs (such as a lazy numpy import) would land on whichever size
+    # ran first and skew the fit
+    opts = replace(opts, warmup=max(opts.warmup, 1))
+    results = []
+    for size in sizes:
+        label = generated_label(size)
+        print(f'Running with {label}:')
+        base_input = input_from_lines(mod, mod.generate_input(size, random.Random(seed)))
+
+        for _ in range(opts.warmup):
+            mod.parse_input(base_input)
+        parse_timing = Timing(problem_name(mod), label, 'parse', '', [])
+        for _ in range(opts.runs):
+            parsed_input, parse_time, peaks = measure_call(opts, mod.parse_input, base_input)
+            parse_timing.times.append(parse_time)
+            parse_timing.record_memory(peaks)
+        results.append(parse_timing)
+
+        for part in parts:
+            print(f'Executing part {part}... ')
+            results.extend(bench_part(mod, label, part, parsed_input, opts))
+            print('[Done]')
+
+    return combine_timings(results)
+
+
+def growth_exponent(sizes: List[int], times: List[float]) -> Optional[float]:
+    # Slope of the least squares fit of log(time) against log(N), i.e. k in time ~ N^k
+    points = [(math.log(n), math.log(t)) for n, t in zip(sizes, times) if t > 0]
+    if len(points) < 2:
+        return None
+    xs, ys = zip(*points)
+    return statistics.linear_regression(xs, ys).slope
+
+
+def print_scaling(results: List[Timing], sizes: List[int]):
+    from prettytable import PrettyTable
+    by_phase = {}
+    for r in results:
+        by_phase.setdefault(r.name, {})[r.input_file] = r.stats()['median']
+
+    table = PrettyTable(["Phase"] + [f'N={n}' for n in sizes] + ["Exponent"])
+    for phase, medians in by_phase.items():
+        times = [medians.get(generated_label(n)) for n in sizes]
+        exponent = growth_exponent(sizes, times)
+        table.add_row([phase] + ['' if t is None else t for t in times] +
+                      ['' if exponent is None else f'{exponent:.2f}'])
+    table.float_format = '.6'
+    print(table)
+
+
+def lookup_stored(store: Optional[ResultStore], problem: str, input_file: str,
+                  parts: List[int]) -> Tuple[List[Timing], List[int]]:
+    # Returns the stored part timings (after a row saying they came from the store) and the parts left to run
+    if store is None:
+        return [], parts
+    found, lookup_time = time_call(store.lookup, problem, input_file, parts)
+    if len(found) == 0:
+        return [], parts
+    stored = [Timing(problem, input_file, 'store', 'hit', [lookup_time])] + list(found.values())
+    return stored, [part for part in parts if part not in found]
+
+
+def save_results(store: Optional[ResultStore], results: List[Timing], verify: bool) -> List[str]:
+    # Returns any answers that differ from the stored ones when verifying, which are left as they were
+    if store is None:
+        return []
+    mismatches = []
+    if verify:
+        results, mismatches = store.verify(results)
+    store.save(results)
+    return mismatches
+
+
+def order_results(results: List[Timing], sources: List[Tuple[str, str]]) -> List[Timing]:
+    # Stored answers are looked up before anything runs, so put them back in among the rest
+    position = {source: n for n, source in enumerate(sources)}
+    return sorted(results, key=lambda r: (position[(r.problem, r.input_file)], r.name.startswith('part'),
+                                          r.name if r.name.startswith('part') else ''))
+
+
+def run_task(problem: str, input_file: str, part: int, opts: Options) -> List[Timing]:
+    # Entry point for pool workers, which have to import the problem for themselves. An exception
+    # fails just this task, so the rest of the run carries on.
+    start = timeit.default_timer()
+    try:
+        mod = import_module(f'problems.{problem}')
+        parsed_input, results = read_and_parse(mod, input_file, opts)
+        return results + bench_part(mod, input_file, part, parsed_input, opts)
+    except Exception:
+        print(traceback.format_exc(), file=sys.stderr)
+        return [Timing(problem, input_file, f'part{part}', Failed('ERROR'), [timeit.default_timer() - start])]
+
+
+def run_parallel(tasks: List[Tuple[str, str, int]], jobs: int, opts: Options) -> List[Timing]:
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(run_task, problem, input_file, part, opts)
+                   for problem, input_file, part in tasks]
+        results = []
+        for (problem, input_file, part), future in zip(tasks, futures):
+            try:
+                results.extend(future.result())
+            except Exception:
+                # The worker itself died, or its results couldn't be sent back
+                print(traceback.format_exc(), file=sys.stderr)
+                results.append(Timing(problem, input_file, f'part{part}', Failed('CRASHED'), [0.0]))
+            print(f'[Done] {problem} part {part} on {input_file}')
+    return combine_timings(results)
+
+
+def batch_paths(source: str):
+    # A directory is walked for every file under it; anything else is a manifest of paths, one per line
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if not name.startswith('.'):
+                    yield os.path.join(root, name)
+        return
+    with (sys.stdin if source == '-' else open(source, 'r')) as f:
+        for line in f:
+            if line.strip():
+                yield line.strip()
+
+
+def init_problem_worker(problem: str):
+    # Import once per worker; every later import_module is a sys.modules lookup
+    import_module(f'problems.{problem}')
+
+
+def solve_batch_input(problem: str, parts: List[int], opts: Options, input_file: str) -> Dict[str, Any]:
+    mod = import_module(f'problems.{problem}')
+    line = {'input': input_file}
+    try:
+        parsed_input, results = read_and_parse(mod, input_file, opts)
+        times = {r.name: r.times[0] for r in results}
+        for part in parts:
+            part_input = copy_input(mod, parsed_input)[0]
+            part_name, result, times[part_name], _, counters = run_part(mod, part, part_input, opts)
+            line[part_name] = str(result)
+            if counters:
+                line[f'{part_name}_counters'] = counters
+        line['times'] = times
+    except Exception as e:
+        line['error'] = f'{type(e).__name__}: {e}'
+    return line
+
+
+def run_batch(problem: str, source: str, parts: List[int], jobs: int, chunksize: Optional[int],
+              out_file: Optional[str], opts: Options) -> int:
+    from concurrent.futures import ProcessPoolExecutor
+    from contextlib import nullcontext
+    from functools import partial
+    paths = list(batch_paths(source))
+    if chunksize is None:
+        # A few chunks per worker keeps them all busy without a round trip per input
+        chunksize = max(1, len(paths) // (jobs * 4))
+    failures = 0
+    start = timeit.default_timer()
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_problem_worker, initargs=(problem,)) as executor, \
+            (open(out_file, 'w') if out_file else nullcontext(sys.stdout)) as out:
+        solve = partial(solve_batch_input, problem, parts, opts)
+        for line in executor.map(solve, paths, chunksize=chunksize):
+            failures += 'error' in line or any(line.get(f'part{p}') in FAILURES for p in parts)
+            out.write(json.dumps(line) + '\n')
+    elapsed = timeit.default_timer() - start
+    print(f'{len(paths)} inputs in {elapsed:.3f}s ({len(paths) / elapsed:.1f}/s), {failures} failed', file=sys.stderr)
+    return failures
+
+
+def handle_request(request: Dict[str, Any], opts: Options) -> Dict[str, Any]:
+    # Requests name a problem and its parts, and give the input as a path or as the text itself
+    mod = import_module(f'problems.{request["problem"]}')
+    opts = replace(opts, runs=request.get('runs', opts.runs), warmup=request.get('warmup', opts.warmup),
+                   counters=request.get('counters', opts.counters))
+    if 'input_path' in request:
+        input_file = request['input_path']
+        parsed_input, results = read_and_parse(mod, input_file, opts)
+    else:
+        input_file = '<request>'
+        base_input = input_from_lines(mod, request['input_data'].splitlines(keepends=True))
+        parsed_input, parse_time, peaks = measure_call(opts, mod.parse_input, base_input)
+        results = [Timing(problem_name(mod), input_file, 'parse', '', [parse_time])]
+        results[-1].record_memory(peaks)
+    for part in request.get('parts', [1, 2]):
+        results.extend(bench_part(mod, input_file, part, parsed_input, opts))
+    return {'results': build_report(combine_timings(results))}
+
+
+def serve(socket_path: str, problems: List[str], opts: Options):
+    import socketserver
+
+    class SolverRequestHandler(socketserver.StreamRequestHandler):
+        # One JSON request per line, answered with one JSON line, for as long as the client stays connected
+
+        def handle(self):
+            for line in self.rfile:
+                try:
+                    response = handle_request(json.loads(line), opts)
+                except Exception:
+                    response = {'error': traceback.format_exc()}
+                self.wfile.write(json.dumps(response).encode() + b'\n')
+                self.wfile.flush()
+
+    # Import everything up front so no request pays for it
+    for problem in problems:
+        for name in heavy_imports(import_module(f'problems.{problem}')):
+            import_module(name)
+    if os.path.lexists(socket_path):
+        # Only a socket left behind by an earlier server is fair game
+        import stat
+        if not stat.S_ISSOCK(os.lstat(socket_path).st_mode):
+            print(f'{socket_path} already exists and is not a socket', file=sys.stderr)
+            sys.exit(1)
+        os.remove(socket_path)
+    with socketserver.UnixStreamServer(socket_path, SolverRequestHandler) as server:
+        print(f'Serving {len(problems)} problems on {socket_path}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(socket_path)
+
+
+def send_requests(socket_path: str, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    import socket
+    responses = []
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        with sock.makefile('rwb') as stream:
+            for request in requests:
+                stream.write(json.dumps(request).encode() + b'\n')
+                stream.flush()
+                responses.append(json.loads(stream.readline()))
+    return responses
+
+
+def timings_from_report(report: List[Dict[str, Any]]) -> List[Timing]:
+    return [Timing(e['problem'], e['input'], e['name'], e['result'], e['times'],
+                   e.get('peak_traced'), e.get('peak_rss'), e.get('counters'))
+            for e in report]
 
 
-def print_results(results):
-    table = PrettyTable(["Part", "Result", "Time"])
-    table.add_rows(results)
+def measure_startup(problem: str) -> Tuple[float, List[Tuple[int, int, str]]]:
+    # Cold start is a fresh interpreter importing the harness and the problem. The wall time
+    # comes from a plain run, since -X importtime has overhead of its own.
+    import subprocess
+    here = os.path.dirname(os.path.abspath(__file__))
+    command = [sys.executable, '-c', f'import harness, problems.{problem}']
+    start = timeit.default_timer()
+    subprocess.run(command, cwd=here, check=True)
+    wall_time = timeit.default_timer() - start
+
+    proc = subprocess.run(command[:1] + ['-X', 'importtime'] + command[1:],
+                          cwd=here, check=True, capture_output=True, text=True)
+    imports = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        imports.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return wall_time, imports
+
+
+def startup_report(problems: List[str], budget_ms: float, top: int) -> bool:
+    from prettytable import PrettyTable
+    within_budget = True
+    summary = PrettyTable(["Problem", "Startup (ms)", "Imports (ms)", "Budget (ms)"])
+    for problem in problems:
+        wall_time, imports = measure_startup(problem)
+        # Top level imports are the ones that aren't indented under another
+        total_us = sum(cumulative for _, cumulative, name in imports if not name.startswith('  '))
+
+        print(f'Slowest imports for {problem}:')
+        table = PrettyTable(["Self (ms)", "Cumulative (ms)", "Module"])
+        table.align["Module"] = 'l'
+        for self_us, cumulative_us, name in sorted(imports, key=lambda i: -i[1])[:top]:
+            table.add_row([self_us / 1000, cumulative_us / 1000, name])
+        table.float_format = '.3'
+        print(table)
+
+        summary.add_row([problem, wall_time * 1000, total_us / 1000, budget_ms])
+        if wall_time * 1000 > budget_ms:
+            within_budget = False
+    summary.float_format = '.1'
+    print(summary)
+    return within_budget
+
+
+def find_problems(pattern: str) -> List[str]:
+    if pattern == 'all':
+        pattern = 'day*'
+    names = [os.path.splitext(os.path.basename(p))[0] for p in glob('problems/day*.py')]
+    matching = [n for n in names if fnmatch(n, pattern)]
+    return sorted(matching, key=lambda n: int(n[len('day'):]))
+
+
+def find_inputs(problem: str, args) -> List[str]:
+    if args.input:
+        return args.input
+    elif args.test:
+        return sorted(glob(f'./test_inputs/{problem}_*.in'))
+    else:
+        return [f'inputs/{problem}.in']
+
+
+def print_results(results: List[Timing], show_source: bool = False):
+    columns = ["Problem", "Input"] if show_source else []
+    columns += ["Phase", "Result"]
+    if all(len(r.times) == 1 for r in results):
+        columns += ["Time"]
+        stat_columns = lambda r: [r.times[0]]
+    else:
+        columns += ["Runs", "Min", "Median", "P95", "Stddev"]
+        stat_columns = lambda r: [len(r.times)] + list(r.stats().values())
+    show_memory = any(r.peak_rss is not None for r in results)
+    if show_memory:
+        columns += ["Peak traced (MB)", "Peak RSS (MB)"]
+    show_counters = any(r.counters for r in results)
+    if show_counters:
+        columns += ["Counters"]
+
+    from prettytable import PrettyTable
+    table = PrettyTable(columns)
+    for r in results:
+        source = [r.problem, r.input_file] if show_source else []
+        memory = [format_mb(r.peak_traced), format_mb(r.peak_rss)] if show_memory else []
+        counters = [format_counters(r.counters)] if show_counters else []
+        table.add_row(source + [r.name, r.result] + stat_columns(r) + memory + counters)
     table.float_format = '.6'
     print(table)
 
 
+def format_mb(num_bytes: Optional[int]) -> str:
+    return '' if num_bytes is None else f'{num_bytes / (1024 * 1024):.1f}'
+
+
+def format_counters(counters: Optional[Dict[str, float]]) -> str:
+    if not counters:
+        return ''
+    return '\n'.join(f'{name}: {value:.6f}' if isinstance(value, float) else f'{name}: {value}'
+                     for name, value in sorted(counters.items()))
+
+
+def build_report(results: List[Timing]) -> List[Dict[str, Any]]:
+    report = []
+    for r in results:
+        report.append({
+            'problem': r.problem,
+            'input': r.input_file,
+            'name': r.name,
+            # Results can be anything the problem returns, so keep them as text
+            'result': str(r.result),
+            'times': r.times,
+            **r.stats(),
+        })
+        if r.peak_rss is not None:
+            report[-1]['peak_traced'] = r.peak_traced
+            report[-1]['peak_rss'] = r.peak_rss
+        if r.counters:
+            report[-1]['counters'] = r.counters
+    return report
+
+
+def write_report(path: str, report: List[Dict[str, Any]]):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+def find_regressions(report: List[Dict[str, Any]], baseline_file: str, threshold: float,
+                     min_slowdown: float) -> List[str]:
+    # Only the parts are compared; reads, parses and copies are too short and noisy to gate on.
+    # A part has to be slower by min_slowdown seconds as well as by the threshold, so that
+    # microsecond timings don't fail on noise.
+    with open(baseline_file, 'r') as f:
+        baseline = {(e['problem'], e['input'], e['name']): e for e in json.load(f)}
+
+    regressions = []
+    for entry in report:
+        if not entry['name'].startswith('part'):
+            continue
+        base = baseline.get((entry['problem'], entry['input'], entry['name']))
+        if base is None:
+            continue
+        if entry['result'] in FAILURES and base['result'] not in FAILURES:
+            regressions.append(f"{entry['problem']} {entry['name']} on {entry['input']}: {entry['result']}")
+            continue
+        limit = max(base['median'] * (1 + threshold), base['median'] + min_slowdown)
+        if entry['median'] > limit:
+            regressions.append(f"{entry['problem']} {entry['name']} on {entry['input']}: "
+                               f"median {entry['median']:.6f}s vs baseline {base['median']:.6f}s")
+    return regressions
+
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
-    parser.add_argument('problem', type=str, help='the problem to run')
+    parser.add_argument('problem', type=str, nargs='?',
+                        help="the problem to run; 'all' or a glob such as 'day1*' runs several "
+                             "(with --serve, the problems to preload, default all)")
     parser.add_argument('-t', '--test', action='store_true', help='run the test inputs')
     parser.add_argument('-i', '--input', type=str, nargs='+', help='manually specify the input file(s) to run with')
     parser.add_argument('-p', '--part', type=int, nargs='+', help='run only the specified part(s) of the problem')
+    parser.add_argument('-j', '--jobs', type=int, help='run parts in a pool of this many worker processes')
+    parser.add_argument('-b', '--bench', type=int, metavar='N',
+                        help='time N runs of each phase (read, parse, copy and parts) and report statistics')
+    parser.add_argument('--warmup', type=int, default=1, help='untimed runs of each part before benchmarking (default 1)')
+    parser.add_argument('--cache-dir', type=str, metavar='DIR', help='cache parsed inputs in DIR between runs')
+    parser.add_argument('--cache-size', type=int, default=256, metavar='MB',
+                        help='evict least recently used parsed inputs beyond this total size (default 256)')
+    parser.add_argument('--profile', action='store_true',
+                        help='profile parsing and each part, printing the top functions and writing collapsed stacks')
+    parser.add_argument('--profile-top', type=int, default=20, metavar='N',
+                        help='number of functions (or imports, with --startup-report) to list by cumulative time (default 20)')
+    parser.add_argument('--profile-dir', type=str, default='profiles', metavar='DIR',
+                        help='where to write collapsed stack files when profiling (default profiles)')
+    parser.add_argument('--mem', action='store_true',
+                        help='record peak traced allocation and peak RSS while parsing and running each part '
+                             '(tracing slows the code down, so times are inflated)')
+    parser.add_argument('--scale', type=str, metavar='N,N,...',
+                        help='run on generated inputs of these sizes (e.g. 1e3,1e4,1e5) and fit how each phase grows')
+    parser.add_argument('--seed', type=int, default=0, help='random seed for generated inputs (default 0)')
+    parser.add_argument('--serve', type=str, metavar='SOCKET',
+                        help='keep the problems imported and answer run requests on this Unix socket')
+    parser.add_argument('--connect', type=str, metavar='SOCKET',
+                        help="send the run to a --serve process instead of running it here; '-i -' sends stdin")
+    parser.add_argument('--batch', type=str, metavar='DIR_OR_MANIFEST',
+                        help="run every input under a directory, or listed in a manifest file ('-' for stdin), "
+                             "writing one JSON line per input")
+    parser.add_argument('--batch-out', type=str, metavar='FILE', help='write the batch JSON lines to FILE instead of stdout')
+    parser.add_argument('--chunksize', type=int, metavar='N', help='inputs handed to a batch worker at a time')
+    parser.add_argument('--startup-report', action='store_true',
+                        help='break down the import time of a cold start and fail if it is over --startup-budget')
+    parser.add_argument('--startup-budget', type=float, default=250, metavar='MS',
+                        help='allowed cold start time in milliseconds (default 250)')
+    parser.add_argument('--timeout', type=float, metavar='SECONDS',
+                        help='run each part in a child process and kill it after SECONDS')
+    parser.add_argument('--max-mem', type=int, metavar='MB',
+                        help='run each part in a child process that may allocate at most MB more memory')
+    parser.add_argument('--parallel-parts', action='store_true',
+                        help='parse once, then run the parts at the same time in forked workers')
+    parser.add_argument('--counters', action='store_true',
+                        help='collect the counters and timers the problem records in problems.utils.metrics')
+    parser.add_argument('--store', type=str, default='.result_store.sqlite', metavar='FILE',
+                        help='reuse answers and timings for unchanged problems and inputs from FILE')
+    parser.add_argument('--store-size', type=int, default=10000, metavar='N',
+                        help='answers to keep in the result store before dropping the least recently used')
+    parser.add_argument('--no-cache', action='store_true', help="don't use the result store; solve everything")
+    parser.add_argument('--verify', action='store_true',
+                        help='solve everything and fail if any answer differs from the result store')
+    parser.add_argument('--json', type=str, metavar='FILE', help='write the results as JSON to FILE')
+    parser.add_argument('--baseline', type=str, metavar='FILE', help='fail if any part regresses against this JSON file')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='allowed fractional slowdown of the median against the baseline (default 0.1)')
+    parser.add_argument('--min-slowdown', type=float, default=0.001, metavar='SECONDS',
+                        help='slowdowns of the median smaller than this are never regressions (default 0.001)')
     args = parser.parse_args()
 
-    mod = import_module(f'problems.{args.problem}')
-
-    inputs = []
-    if args.input:
-        inputs = args.input
-    elif args.test:
-        inputs = glob(f'./test_inputs/{args.problem}_*.in')
-    else:
-        inputs = [f'inputs/{args.problem}.in']
+    if args.problem is None:
+        if not args.serve:
+            parser.error('the problem to run is required')
+        args.problem = 'all'
+    problems = find_problems(args.problem)
+    if len(problems) == 0:
+        parser.error(f'No problems match {args.problem}')
 
     parts = []
     if args.part:
@@ -65,8 +1147,117 @@ if __name__ == '__main__':
     else:
         parts = [1, 2]
 
-    for i in inputs:
-        print(f'Running with input {i}:')
-        results = run(i, parts)
-        print_results(results)
-    
\ No newline at end of file
+    opts = Options(cache_dir=args.cache_dir, cache_size=args.cache_size * 1024 * 1024, mem=args.mem,
+                   timeout=args.timeout, parallel_parts=args.parallel_parts, counters=args.counters)
+    if args.max_mem:
+        opts.max_mem = args.max_mem * 1024 * 1024
+    if args.profile:
+        opts.profile_dir = args.profile_dir
+        opts.profile_top = args.profile_top
+    if args.bench:
+        opts.runs = args.bench
+        opts.warmup = args.warmup
+
+    store = None
+    # These modes never look anything up in the store, so it isn't opened for them
+    uses_store = not (args.startup_report or args.serve or args.batch or args.scale or args.connect)
+    if uses_store and not (args.no_cache or args.bench or args.profile or args.mem or args.counters):
+        # Stored timings would be meaningless for these, so they always run
+        store = ResultStore(args.store, args.store_size)
+    elif args.verify:
+        parser.error('--verify needs the result store')
+    # Answers are still saved, but stored timings mustn't be reported as new ones where they're written
+    # out or compared against a baseline
+    lookup_store = None if (args.verify or args.json or args.baseline) else store
+
+    all_results = []
+    mismatches = []
+    if args.startup_report:
+        if not startup_report(problems, args.startup_budget, args.profile_top):
+            print(f'Cold start is over the budget of {args.startup_budget}ms')
+            sys.exit(1)
+    elif args.serve:
+        serve(args.serve, problems, opts)
+    elif args.batch:
+        if len(problems) != 1:
+            parser.error('--batch runs a single problem')
+        failures = run_batch(problems[0], args.batch, parts, args.jobs or os.cpu_count(), args.chunksize,
+                             args.batch_out, opts)
+        sys.exit(1 if failures else 0)
+    elif args.connect:
+        requests = []
+        for problem in problems:
+            for i in find_inputs(problem, args):
+                request = {'problem': problem, 'parts': parts, 'runs': opts.runs, 'warmup': opts.warmup,
+                           'counters': opts.counters}
+                if i == '-':
+                    request['input_data'] = sys.stdin.read()
+                else:
+                    # The server may be running from another directory
+                    request['input_path'] = os.path.abspath(i)
+                requests.append(request)
+        for response in send_requests(args.connect, requests):
+            if 'error' in response:
+                print(response['error'])
+                sys.exit(1)
+            all_results.extend(timings_from_report(response['results']))
+        print_results(all_results, show_source=True)
+    elif args.scale:
+        sizes = sorted(int(float(n)) for n in args.scale.split(','))
+        for problem in problems:
+            mod = import_module(f'problems.{problem}')
+            if not hasattr(mod, 'generate_input'):
+                print(f'{problem} has no input generator, skipping')
+                continue
+            print(f'Scaling {problem}:')
+            results = run_scaled(mod, sizes, parts, args.seed, opts)
+            print_results(results, show_source=True)
+            print_scaling(results, sizes)
+            all_results.extend(results)
+    # Profiles are printed as they're taken, so keep them in order rather than in a pool
+    elif (len(problems) > 1 or args.jobs) and not args.profile:
+        sources = [(problem, i) for problem in problems for i in find_inputs(problem, args)]
+        tasks = []
+        for problem, i in sources:
+            stored, remaining = lookup_stored(lookup_store, problem, i, parts)
+            all_results.extend(stored)
+            tasks.extend((problem, i, part) for part in remaining)
+        if len(tasks) > 0:
+            all_results.extend(run_parallel(tasks, args.jobs or os.cpu_count(), opts))
+        all_results = order_results(all_results, sources)
+        print_results(all_results, show_source=True)
+        mismatches = save_results(store, all_results, args.verify)
+    else:
+        for problem in problems:
+            mod = import_module(f'problems.{problem}')
+            inputs = find_inputs(problem, args)
+            lookups = {i: lookup_stored(lookup_store, problem, i, parts) for i in inputs}
+            # Only inputs with parts left to run need parsing
+            prefetched = prefetch_inputs(mod, [i for i in inputs if len(lookups[i][1]) > 0], opts)
+            for i in inputs:
+                print(f'Running {problem} with input {i}:' if len(problems) > 1 else f'Running with input {i}:')
+                results, remaining = lookups[i]
+                if len(remaining) > 0:
+                    _, prefetched_input = next(prefetched)
+                    results = order_results(results + run(mod, i, remaining, opts, prefetched_input), [(problem, i)])
+                print_results(results)
+                all_results.extend(results)
+        mismatches = save_results(store, all_results, args.verify)
+
+    if len(mismatches) > 0:
+        print("Answers that don't match the result store:")
+        for m in mismatches:
+            print(f'  {m}')
+        sys.exit(1)
+
+    report = build_report(all_results)
+    if args.json:
+        write_report(args.json, report)
+
+    if args.baseline:
+        regressions = find_regressions(report, args.baseline, args.threshold, args.min_slowdown)
+        if len(regressions) > 0:
+            print('Regressions against baseline:')
+            for r in regressions:
+                print(f'  {r}')
+            sys.exit(1)
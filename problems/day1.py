@@ -1,25 +1,145 @@
 #!/usr/bin/env python3
 
+from itertools import combinations
+import math
+import random
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# The numpy strategy's import is deferred until it's used
+HEAVY_IMPORTS = ('numpy',)
+
+
 def parse_input(lines):
-    return set(int(r.strip()) for r in lines)
+    # A sorted list rather than a set, so repeated entries can each be used
+    return sorted(int(r.strip()) for r in lines)
+
+
+def two_sum_pointers(entries: List[int], target: int) -> Optional[Tuple[int, int]]:
+    lo, hi = 0, len(entries) - 1
+    while lo < hi:
+        total = entries[lo] + entries[hi]
+        if total == target:
+            return entries[lo], entries[hi]
+        if total < target:
+            lo += 1
+        else:
+            hi -= 1
+    return None
+
+
+def two_sum_searchsorted(entries, target: int) -> Optional[Tuple[int, int]]:
+    import numpy as np
+    # For each entry, the first place its complement could be after it in the sorted array
+    wanted = target - entries
+    found = np.maximum(np.searchsorted(entries, wanted), np.arange(1, len(entries) + 1))
+    matches = np.nonzero(found < len(entries))[0]
+    matches = matches[entries[found[matches]] == wanted[matches]]
+    if len(matches) == 0:
+        return None
+    return int(entries[matches[0]]), int(wanted[matches[0]])
+
+
+def k_sum_sorted(entries, target: int, k: int, two_sum) -> Optional[Tuple[int, ...]]:
+    # Fixes the smallest entry of the combination and looks for the other k - 1 after it
+    if k == 2:
+        return two_sum(entries, target)
+    for i in range(len(entries) - k + 1):
+        first = entries[i]
+        # Everything after is at least as big, so nothing from here on can be small enough
+        if first * k > target:
+            break
+        if i > 0 and entries[i - 1] == first:
+            continue
+        rest = k_sum_sorted(entries[i + 1:], target - first, k - 1, two_sum)
+        if rest is not None:
+            return (int(first), *rest)
+    return None
+
 
-def calc_part1(report, target):
-    for e in report:
-        if target - e in report:
-            return e * (target - e)
+def k_sum_meet_in_middle(entries: List[int], target: int, k: int) -> Optional[Tuple[int, ...]]:
+    # Sums of every combination of half the entries, looked up from the other half's combinations
+    half = k // 2
+    by_sum: Dict[int, List[Tuple[int, ...]]] = {}
+    for combo in combinations(range(len(entries)), half):
+        by_sum.setdefault(sum(entries[i] for i in combo), []).append(combo)
+    for combo in combinations(range(len(entries)), k - half):
+        for other in by_sum.get(target - sum(entries[i] for i in combo), []):
+            # Each entry can only be used once
+            if set(other).isdisjoint(combo):
+                return tuple(sorted(entries[i] for i in other + combo))
     return None
 
+
+STRATEGIES = ['two_pointer', 'meet_in_middle', 'numpy']
+
+
+def find_k_sum(report: Iterable[int], target: int, k: int, strategy: str = 'auto') -> Optional[Tuple[int, ...]]:
+    # Finds k entries (each used at most once, though repeated values can each be used) summing to target
+    entries = sorted(report)
+    if k < 1 or len(entries) < k:
+        return None
+    if k == 1:
+        return (target,) if target in entries else None
+    if strategy == 'auto':
+        # Below about a thousand entries, numpy's call overhead costs more than it saves
+        strategy = 'numpy' if len(entries) >= 1000 else 'two_pointer'
+    if strategy == 'two_pointer':
+        return k_sum_sorted(entries, target, k, two_sum_pointers)
+    if strategy == 'meet_in_middle':
+        return k_sum_meet_in_middle(entries, target, k)
+    if strategy == 'numpy':
+        import numpy as np
+        return k_sum_sorted(np.array(entries, dtype=np.int64), target, k, two_sum_searchsorted)
+    raise ValueError(f'Unknown strategy {strategy}')
+
+
+def product_of_k_sum(report: List[int], target: int, k: int) -> Optional[int]:
+    entries = find_k_sum(report, target, k)
+    return None if entries is None else math.prod(entries)
+
 def part1(report):
-    return calc_part1(report, 2020)
+    return product_of_k_sum(report, 2020, 2)
 
 def part2(report):
-    # Create a set of 2020 - e for e in the original set
-    report_minus = set(2020 - e for e in report)    
-    for target in report_minus:
-        # First number, from our original set
-        e1 = 2020 - target
-        # Now try to find a second and third number by applying the logic from part1
-        res = calc_part1(report, target)
-        if res != None:
-            return e1 * res
-    return None
\ No newline at end of file
+    return product_of_k_sum(report, 2020, 3)
+
+
+def generate_input(size: int, rng: random.Random) -> List[str]:
+    # Entries above 2020 can't be part of an answer, so only the planted pair and triple count
+    report = set()
+    while len(report) < size - 5:
+        report.add(rng.randint(2021, 2021 + 10 * size))
+    pair = rng.randint(1, 1009)
+    report.update([pair, 2020 - pair])
+    a, b = rng.sample(range(1011, 1300), 2)
+    report.update([a - 1000, b - 1000, 2020 - (a - 1000) - (b - 1000)])
+    report = list(report)
+    rng.shuffle(report)
+    return [f'{e}\n' for e in report]
+
+
+def benchmark_strategies(sizes: List[int], k: int, seed: int = 0):
+    import timeit
+    from prettytable import PrettyTable
+    table = PrettyTable(['N'] + STRATEGIES)
+    for size in sizes:
+        report = parse_input(generate_input(size, random.Random(seed)))
+        row = [size]
+        for strategy in STRATEGIES:
+            # Meet in the middle holds every half-combination, so it's only tried on small reports
+            if strategy == 'meet_in_middle' and size ** (k - k // 2) > 10 ** 7:
+                row.append('')
+                continue
+            row.append(min(timeit.repeat(lambda: find_k_sum(report, 2020, k, strategy), number=1, repeat=3)))
+        table.add_row(row)
+    table.float_format = '.6'
+    print(table)
+
+
+if __name__ == '__main__':
+    # Compares the k-sum strategies on generated reports: python -m problems.day1 [k] [N ...]
+    import sys
+    k = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    sizes = [int(float(n)) for n in sys.argv[2:]] or [10 ** 2, 10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6]
+    benchmark_strategies(sizes, k)
@@ -1,4 +1,5 @@
 from collections import Counter
+import random
 from typing import List
 
 
@@ -40,4 +41,14 @@ def part2(adaptors: List[int]):
 
     combos = joltage_combos(adaptors, 0, dict())
 
-    return combos
\ No newline at end of file
+    return combos
+
+
+def generate_input(size: int, rng: random.Random) -> List[str]:
+    adaptors = []
+    joltage = 0
+    for _ in range(size):
+        joltage += rng.choice([1, 1, 1, 3])
+        adaptors.append(joltage)
+    rng.shuffle(adaptors)
+    return [f'{a}\n' for a in adaptors]
@@ -1,102 +1,103 @@
+from functools import partial
+import math
+import random
 from typing import List, Tuple
 
+from .utils import Grid, metrics
+
+# Grid imports numpy on first use
+HEAVY_IMPORTS = ('numpy',)
+
 
 CELL_EMPTY = 'L'
 CELL_OCCUPIED = '#'
 CELL_FLOOR = '.'
 
+FLOOR, EMPTY, OCCUPIED = 0, 1, 2
+CODES = {CELL_FLOOR: FLOOR, CELL_EMPTY: EMPTY, CELL_OCCUPIED: OCCUPIED}
 
-def parse_input(lines):
-    return [[cell for cell in line.strip()] for line in lines]
-
-
-def adjacent_occupied_count(board: List[List[str]], row: int, col: int) -> int:
-    count = 0
-    for row_offset in [-1, 0, 1]:
-        cur_row = row + row_offset
-        # Don't check the row if out of bounds
-        if cur_row < 0 or cur_row >= len(board):
-            continue
-        for col_offset in [-1, 0, 1]:
-            cur_col = col + col_offset
-            # Don't check out of bounds columns
-            if cur_col < 0 or cur_col >= len(board[cur_row]):
-                continue
-            # Check neighbours but not the central cell
-            if row_offset == 0 and col_offset == 0:
-                continue
-            if board[cur_row][cur_col] == CELL_OCCUPIED:
-                count += 1
-    return count
-
-
-def part1_rule(board: List[List[str]], row: int, col: int):
-    if board[row][col] == CELL_EMPTY:
-        if adjacent_occupied_count(board, row, col) == 0:
-            return CELL_OCCUPIED
-    elif board[row][col] == CELL_OCCUPIED:
-        if adjacent_occupied_count(board, row, col) >= 4:
-            return CELL_EMPTY
-    return board[row][col]
-
-
-def step(board: List[List[str]], rule) -> Tuple[List[List[str]], bool]:
-    has_changed = False
-    next_board = [r.copy() for r in board]
-    for row in range(len(board)):
-        for col in range(len(board[row])):
-            next_board[row][col] = rule(board, row, col)
-            if next_board[row][col] != board[row][col]:
-                has_changed = True
-    return next_board, has_changed
-
-
-def total_occupied_seats(board: List[List[str]]) -> int:
-    return sum([cell == CELL_OCCUPIED for row in board for cell in row])
-
-
-def find_equilibrium(board: List[List[str]], rule) -> List[List[str]]:
-    still_changing = True
-    while still_changing:
-        board, still_changing = step(board, rule)
-    return board
-
-
-def part1(board: List[List[str]]):
-    return total_occupied_seats(find_equilibrium(board, part1_rule))
+DIRECTIONS = [(row_dir, col_dir)
+              for row_dir in [-1, 0, 1]
+              for col_dir in [-1, 0, 1]
+              if row_dir != 0 or col_dir != 0]
 
 
-def is_first_visible_occupied(board: List[List[str]], row: int, col: int, move_vec: Tuple[int, int]) -> bool:
-    while True:
-        row = row + move_vec[0]
-        col = col + move_vec[1]
-        # Can't be occupied off the board
-        if row < 0 or col < 0 or row >= len(board) or col >= len(board[row]):
-            return False
+def parse_input(lines):
+    return Grid.from_lines(lines, CODES)
 
-        if board[row][col] == CELL_EMPTY:
-            return False
-        elif board[row][col] == CELL_OCCUPIED:
-            return True
 
+def adjacent_occupied_counts(board: Grid):
+    return board.neighbour_counts(OCCUPIED)
 
 
-def visible_occupied_count(board: List[List[str]], row: int, col: int) -> int:
-    return sum([is_first_visible_occupied(board, row, col, (row_dir, col_dir)) 
-                for row_dir in [-1, 0, 1] 
-                for col_dir in [-1, 0, 1]
-                if row_dir != 0 or col_dir != 0])
+def step(board: Grid, occupied_counts, crowded: int) -> Tuple[Grid, bool]:
+    if metrics.enabled:
+        metrics.count('steps')
+        metrics.count('cells evaluated', board.cells.size)
+    count = occupied_counts(board)
+    cells = board.cells.copy()
+    # Empty seats with no occupied neighbours fill up, and occupied ones with too many empty out
+    cells[(board.cells == EMPTY) & (count == 0)] = OCCUPIED
+    cells[(board.cells == OCCUPIED) & (count >= crowded)] = EMPTY
+    next_board = Grid(cells)
+    return next_board, next_board.changed(board)
 
 
-def part2_rule(board: List[List[str]], row: int, col: int):
-    if board[row][col] == CELL_EMPTY:
-        if visible_occupied_count(board, row, col) == 0:
-            return CELL_OCCUPIED
-    elif board[row][col] == CELL_OCCUPIED:
-        if visible_occupied_count(board, row, col) >= 5:
-            return CELL_EMPTY
-    return board[row][col]
+def find_equilibrium(board: Grid, occupied_counts, crowded: int) -> Grid:
+    still_changing = True
+    while still_changing:
+        board, still_changing = step(board, occupied_counts, crowded)
+    return board
 
 
-def part2(board: List[List[str]]):
-    return total_occupied_seats(find_equilibrium(board, part2_rule))
\ No newline at end of file
+def part1(board: Grid):
+    return find_equilibrium(board, adjacent_occupied_counts, 4).count(OCCUPIED)
+
+
+def first_visible_seats(board: Grid):
+    # For each direction, the flat index of the first seat seen from each cell, or one past
+    # the end of the board (which always reads as unoccupied) if there isn't one
+    import numpy as np
+    rows, cols = board.shape
+    nothing = rows * cols
+    index = np.arange(nothing).reshape(rows, cols)
+    is_seat = board.cells != FLOOR
+    visible = []
+    for row_dir, col_dir in DIRECTIONS:
+        # Transposing turns looking sideways into looking up or down
+        transpose = row_dir == 0
+        seats, indices = (is_seat.T, index.T) if transpose else (is_seat, index)
+        along, across = (col_dir, row_dir) if transpose else (row_dir, col_dir)
+        first = np.full(seats.shape, nothing)
+        cols_from = np.arange(seats.shape[1]) + across
+        in_bounds = (cols_from >= 0) & (cols_from < seats.shape[1])
+        cols_from = cols_from[in_bounds]
+        # Work back from the edge being looked towards, so the next row along is always done
+        order = range(seats.shape[0] - 1, -1, -1) if along > 0 else range(seats.shape[0])
+        for row in order:
+            row_from = row + along
+            if 0 <= row_from < seats.shape[0]:
+                first[row, in_bounds] = np.where(seats[row_from, cols_from],
+                                                 indices[row_from, cols_from],
+                                                 first[row_from, cols_from])
+        visible.append((first.T if transpose else first).ravel())
+    return np.stack(visible)
+
+
+def visible_occupied_counts(visible, board: Grid):
+    import numpy as np
+    occupied = np.append((board.cells == OCCUPIED).ravel(), False)
+    return occupied[visible].sum(axis=0).reshape(board.shape)
+
+
+def part2(board: Grid):
+    # Seats never move, so who can see whom only has to be worked out once
+    occupied_counts = partial(visible_occupied_counts, first_visible_seats(board))
+    return find_equilibrium(board, occupied_counts, 5).count(OCCUPIED)
+
+
+def generate_input(size: int, rng: random.Random) -> List[str]:
+    # size is the number of cells on a square board
+    side = max(1, math.isqrt(size))
+    return [''.join(CELL_EMPTY if rng.random() < 0.7 else CELL_FLOOR for _ in range(side)) + '\n'
+            for _ in range(side)]
@@ -1,12 +1,16 @@
-import cmath
 from dataclasses import dataclass
 import math
+import random
 import re
+from typing import List
 
-from .utils import parse_lines_regex
+from .utils import iter_buffer_regex
 
+# Actions are matched straight out of the mapped file
+INPUT_MODE = 'mmap'
 
-LINE_RE = re.compile(r'^([A-Z])(\d+)$')
+
+LINE_RE = re.compile(rb'^[ \t]*([A-Z])(\d+)[ \t\r]*$', re.MULTILINE)
 
 
 @dataclass(frozen=True)
@@ -23,11 +27,11 @@ class State:
 
 
 def parse_action(m: re.Match):
-    return Action(m.group(1), int(m.group(2)))
+    return Action(m.group(1).decode(), int(m.group(2)))
 
 
-def parse_input(lines):
-    return parse_lines_regex(lines, LINE_RE, parse_action)
+def parse_input(buffer):
+    return list(iter_buffer_regex(buffer, LINE_RE, parse_action))
 
 
 def manhattan_distance(pos: complex):
@@ -48,6 +52,7 @@ def execute_action_part1(state: State, action: Action):
     elif action.command == 'R':
         state.dir = (state.dir - action.val) % 360
     elif action.command == 'F':
+        import cmath
         move_vec = cmath.rect(action.val, math.radians(state.dir))
         move_vec = complex(round(move_vec.real), round(move_vec.imag))
         state.pos += move_vec
@@ -61,6 +66,7 @@ def part1(actions):
     
 
 def rotate_deg(vec: complex, deg: int):
+    import cmath
     r, phi = cmath.polar(vec)
     phi += math.radians(deg)
     return cmath.rect(r, phi)
@@ -87,4 +93,13 @@ def part2(actions):
     state = State(0 + 0j, 0, 10 + 1j)
     for action in actions:
         execute_action_part2(state, action)
-    return manhattan_distance(state.pos)
\ No newline at end of file
+    return manhattan_distance(state.pos)
+
+
+def generate_input(size: int, rng: random.Random) -> List[str]:
+    lines = []
+    for _ in range(size):
+        command = rng.choice('NSEWLRFFF')
+        val = rng.choice([90, 180, 270]) if command in 'LR' else rng.randint(1, 100)
+        lines.append(f'{command}{val}\n')
+    return lines
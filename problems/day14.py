@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+import random
 import re
 from typing import Dict, List
 
@@ -113,4 +114,18 @@ def apply_set_value_part2(state: State, instr: SetValueInstr):
 def part2(program: List[Instr]):
     state = initial_state(program)
     run_program(state, apply_set_value_part2)
-    return sum(state.values.values())
\ No newline at end of file
+    return sum(state.values.values())
+
+
+def generate_input(size: int, rng: random.Random) -> List[str]:
+    # A few floating bits per mask, so part2 writes a bounded number of addresses
+    lines = []
+    for i in range(size):
+        if i % 5 == 0:
+            mask = [rng.choice('01') for _ in range(36)]
+            for pos in rng.sample(range(36), rng.randint(1, 6)):
+                mask[pos] = 'X'
+            lines.append(f'mask = {"".join(mask)}\n')
+        else:
+            lines.append(f'mem[{rng.randint(0, 65535)}] = {rng.randint(0, 2 ** 30)}\n')
+    return lines
@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 from functools import reduce
+import random
 import re
 from typing import Dict, List, Tuple
 
@@ -135,4 +136,29 @@ def part2(data: Data):
     decoded_ticket = apply_mapping(mapping, data.my_ticket)
     departure_fields = {f: v for f, v in decoded_ticket.items() if f.startswith('departure')}
     return reduce(lambda a, b: a * b, departure_fields.values())
-    
+
+
+def generate_input(size: int, rng: random.Random) -> List[str]:
+    # Field i accepts 1 to 10(i+1), and each column hits the top of its field's range,
+    # so the fields can be eliminated one at a time. size is the number of nearby tickets.
+    num_fields = 20
+    names = [f'departure f{i}' if i < 6 else f'field f{i}' for i in range(num_fields)]
+    rng.shuffle(names)
+    column_fields = list(range(num_fields))
+    rng.shuffle(column_fields)
+
+    def ticket():
+        return [rng.randint(1, 10 * (f + 1)) for f in column_fields]
+
+    lines = [f'{names[i]}: 1-{5 * (i + 1)} or {5 * (i + 1) + 1}-{10 * (i + 1)}\n' for i in range(num_fields)]
+    lines.extend(['\n', 'your ticket:\n', ','.join(str(v) for v in ticket()) + '\n', '\n', 'nearby tickets:\n'])
+    tickets = [[10 * (f + 1) for f in column_fields]]
+    while len(tickets) < size:
+        t = ticket()
+        if rng.random() < 0.2:
+            # Invalid for every field
+            t[rng.randrange(num_fields)] = rng.randint(10 * num_fields + 1, 999)
+        tickets.append(t)
+    rng.shuffle(tickets)
+    lines.extend(','.join(str(v) for v in t) + '\n' for t in tickets)
+    return lines
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+import random
 from typing import List
 
 ## Grammar Pt1
@@ -271,4 +272,21 @@ def part2(tokenised_exprs: List[List[Token]]):
     tokenised_exprs = [reverse_tokens(tokens) for tokens in tokenised_exprs]
     exprs = [Part2Parser(tokens).parse() for tokens in tokenised_exprs]
     results = [expr.eval() for expr in exprs]
-    return sum(results)
\ No newline at end of file
+    return sum(results)
+
+
+def generate_expression(rng: random.Random, depth: int) -> str:
+    terms = []
+    for _ in range(rng.randint(2, 5)):
+        if depth > 0 and rng.random() < 0.3:
+            terms.append(f'({generate_expression(rng, depth - 1)})')
+        else:
+            terms.append(str(rng.randint(1, 9)))
+    expr = terms[0]
+    for term in terms[1:]:
+        expr += f' {rng.choice("+*")} {term}'
+    return expr
+
+
+def generate_input(size: int, rng: random.Random) -> List[str]:
+    return [generate_expression(rng, 3) + '\n' for _ in range(size)]
@@ -2,6 +2,12 @@ from dataclasses import dataclass
 import sys
 from typing import Dict, List
 
+from .utils import metrics
+
+
+# part2 rewrites the rules in place
+MUTATES_INPUT = True
+
 
 @dataclass
 class Rule:
@@ -153,6 +159,8 @@ class RulesMatcher(Rules):
         return result
 
     def match_recursive(self, rule: Rule) -> bool:
+        if metrics.enabled:
+            metrics.count('match_recursive calls')
         self.log_rule(rule)
         result = False
         if rule.is_literal():
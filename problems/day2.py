@@ -1,7 +1,19 @@
+from dataclasses import dataclass
+import random
 import re
-from typing import NamedTuple
+import string
+from typing import TYPE_CHECKING, List, NamedTuple
 
-from .utils import parse_lines_regex
+from .utils import iter_buffer_regex
+
+if TYPE_CHECKING:
+    # numpy is only imported when parsing
+    import numpy as np
+
+# Rows are matched in one pass over the mapped file
+INPUT_MODE = 'mmap'
+
+HEAVY_IMPORTS = ('numpy',)
 
 
 class Row(NamedTuple):
@@ -10,31 +22,82 @@ class Row(NamedTuple):
     requiredChar: str
     password: str
 
-LINE_RE = re.compile(r'(\d+)-(\d+) (\w): (\w+)')
+LINE_RE = re.compile(rb'^[ \t]*(\d+)-(\d+) (\w): (\w+)[ \t\r]*$', re.MULTILINE)
 
 
 def construct_row(m: re.Match):
     return Row(lowerBound=int(m.group(1)), 
                upperBound=int(m.group(2)), 
-               requiredChar=m.group(3), 
-               password=m.group(4))
+               requiredChar=m.group(3).decode(),
+               password=m.group(4).decode())
+
+
+def parse_rows(buffer) -> List[Row]:
+    return list(iter_buffer_regex(buffer, LINE_RE, construct_row))
+
+
+@dataclass
+class Columns:
+    lower_bounds: 'np.ndarray'
+    upper_bounds: 'np.ndarray'
+    required_chars: 'np.ndarray'
+    # One row of bytes per password, padded with zeros to the longest
+    passwords: 'np.ndarray'
+
+
+def parse_input(buffer) -> Columns:
+    import numpy as np
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    matches = LINE_RE.findall(buffer)
+    line_count = np.count_nonzero(data == ord('\n')) + (len(data) > 0 and data[-1] != ord('\n'))
+    if len(matches) != line_count:
+        # Either blank lines or ones that don't match; the row parser tells them apart
+        matches = [(str(r.lowerBound), str(r.upperBound), r.requiredChar, r.password) for r in parse_rows(buffer)]
+    if len(matches) == 0:
+        return Columns(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+                       np.zeros(0, dtype=np.uint8), np.zeros((0, 1), dtype=np.uint8))
+    lower, upper, chars, passwords = zip(*matches)
+    lengths = np.array([len(p) for p in passwords])
+    passwords = np.array(passwords, dtype=bytes)
+    columns = Columns(lower_bounds=np.array(lower, dtype=bytes).astype(np.int64),
+                      upper_bounds=np.array(upper, dtype=bytes).astype(np.int64),
+                      required_chars=np.array(chars, dtype=bytes).view(np.uint8),
+                      passwords=passwords.view(np.uint8).reshape(len(passwords), -1))
+    # Positions past the end of a password would read the zero padding rather than fail
+    bad = ((columns.lower_bounds < 1) | (columns.lower_bounds > columns.upper_bounds) |
+           (columns.upper_bounds > lengths))
+    if bad.any():
+        row = int(np.argmax(bad))
+        raise ValueError(f'Policy {columns.lower_bounds[row]}-{columns.upper_bounds[row]} is out of range '
+                         f'for password {passwords[row].decode()}')
+    return columns
 
 
-def parse_input(lines):
-    return parse_lines_regex(lines, LINE_RE, construct_row)
+def valid_passwords_pt1(columns: Columns):
+    counts = (columns.passwords == columns.required_chars[:, None]).sum(axis=1)
+    return (counts >= columns.lower_bounds) & (counts <= columns.upper_bounds)
 
+def valid_passwords_pt2(columns: Columns):
+    import numpy as np
+    rows = np.arange(len(columns.passwords))
+    pos_a = columns.passwords[rows, columns.lower_bounds - 1]
+    pos_b = columns.passwords[rows, columns.upper_bounds - 1]
+    return (pos_a == columns.required_chars) ^ (pos_b == columns.required_chars)
 
-def is_password_valid_pt1(row: Row):
-    count = row.password.count(row.requiredChar)
-    return count >= row.lowerBound and count <= row.upperBound
+def part1(columns: Columns):
+    return int(valid_passwords_pt1(columns).sum())
 
-def is_password_valid_pt2(row: Row):
-    pos_a = row.password[row.lowerBound - 1]
-    pos_b = row.password[row.upperBound - 1]
-    return (pos_a == row.requiredChar) ^ (pos_b == row.requiredChar)
+def part2(columns: Columns):
+    return int(valid_passwords_pt2(columns).sum())
 
-def part1(rows):
-    return sum(is_password_valid_pt1(r) for r in rows)
 
-def part2(rows):
-    return sum(is_password_valid_pt2(r) for r in rows)
\ No newline at end of file
+def generate_input(size: int, rng: random.Random) -> List[str]:
+    lines = []
+    for _ in range(size):
+        length = rng.randint(4, 20)
+        lower = rng.randint(1, length - 1)
+        upper = rng.randint(lower + 1, length)
+        char = rng.choice(string.ascii_lowercase)
+        password = ''.join(rng.choice(string.ascii_lowercase[:8]) for _ in range(length))
+        lines.append(f'{lower}-{upper} {char}: {password}\n')
+    return lines
@@ -1,6 +1,8 @@
 from collections import defaultdict
 from copy import deepcopy
 from dataclasses import dataclass
+import random
+import string
 from typing import Dict, List, Set
 
 
@@ -76,4 +78,27 @@ def build_part2_result(final_mapping: Dict[str, str]) -> str:
 def part2(recipes: List[Recipe]) -> str:
     allergen_mapping = find_allergen_mappings(recipes)
     final_mapping = deduce_allergens(allergen_mapping)
-    return build_part2_result(final_mapping)
\ No newline at end of file
+    return build_part2_result(final_mapping)
+
+
+def generate_input(size: int, rng: random.Random) -> List[str]:
+    # Two anchor recipes per allergen share only its ingredient, so the mapping is always
+    # deducible; the rest are random. size is the number of recipes.
+    allergens = ['dairy', 'eggs', 'fish', 'nuts', 'peanuts', 'sesame', 'shellfish', 'soy', 'wheat']
+    ingredients = [''.join(rng.choice(string.ascii_lowercase) for _ in range(6)) + str(i)
+                   for i in range(len(allergens) + 200)]
+    allergen_ingredients = dict(zip(allergens, ingredients))
+    safe = ingredients[len(allergens):]
+
+    lines = []
+    for allergen in allergens:
+        picked = rng.sample(safe, 20)
+        for others in [picked[:10], picked[10:]]:
+            lines.append(f'{" ".join([allergen_ingredients[allergen]] + others)} (contains {allergen})\n')
+    while len(lines) < size:
+        listed = rng.sample(allergens, rng.randint(1, 3))
+        unlisted = [allergen_ingredients[a] for a in allergens if a not in listed and rng.random() < 0.2]
+        recipe = [allergen_ingredients[a] for a in listed] + unlisted + rng.sample(safe, rng.randint(5, 40))
+        rng.shuffle(recipe)
+        lines.append(f'{" ".join(recipe)} (contains {", ".join(listed)})\n')
+    return lines
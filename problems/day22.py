@@ -1,6 +1,13 @@
 from dataclasses import dataclass
+import random
 from typing import Iterable, List, Set, Tuple
 
+from .utils import metrics
+
+
+# part1 plays the game directly on the starting hands
+MUTATES_INPUT = True
+
 
 @dataclass
 class Hands:
@@ -70,6 +77,8 @@ def play_pt2_game(hands: Hands, depth: int = 0) -> Tuple[int, Hands]:
         if len(hands.player1) >= p1card and len(hands.player2) >= p2card:
             # Recursive round
             rec_hands = Hands([c for c in hands.player1[:p1card]], [c for c in hands.player2[:p2card]])
+            if metrics.enabled:
+                metrics.count('sub-games')
             round_winner, _ = play_pt2_game(rec_hands, depth + 1)
             used_cards = [p1card, p2card] if round_winner == 0 else [p2card, p1card]
             hands.put_cards(round_winner, used_cards)
@@ -87,4 +96,38 @@ def play_pt2_game(hands: Hands, depth: int = 0) -> Tuple[int, Hands]:
 
 def part2(starting_hands: Hands) -> int:
     winner, final_hands = play_pt2_game(starting_hands)
-    return get_score(final_hands.player_hand(winner))
\ No newline at end of file
+    return get_score(final_hands.player_hand(winner))
+
+
+# Recursive combat's running time grows so quickly with the deck (a random 50 card deal can take
+# many seconds) that generated decks stop at this many cards; bigger sizes repeat it
+MAX_GENERATED_CARDS = 30
+
+
+def pt1_game_ends(hands: Hands) -> bool:
+    # Some deals loop forever without part2's repeat rule, which part1 would never return from
+    hands = hands.copy()
+    seen = set()
+    while len(hands.player1) > 0 and len(hands.player2) > 0:
+        if hands in seen:
+            return False
+        seen.add(hands.copy())
+        p1card, p2card = hands.draw()
+        if p1card > p2card:
+            hands.put_cards(0, [p1card, p2card])
+        else:
+            hands.put_cards(1, [p2card, p1card])
+    return True
+
+
+def generate_input(size: int, rng: random.Random) -> List[str]:
+    # size is the total number of cards, dealt evenly, up to MAX_GENERATED_CARDS
+    size = min(size, MAX_GENERATED_CARDS)
+    cards = list(range(1, size + 1))
+    half = size // 2
+    while True:
+        rng.shuffle(cards)
+        if pt1_game_ends(Hands(cards[:half], cards[half:])):
+            break
+    return (['Player 1:\n'] + [f'{c}\n' for c in cards[:half]] +
+            ['\n', 'Player 2:\n'] + [f'{c}\n' for c in cards[half:]])
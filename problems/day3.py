@@ -1,23 +1,44 @@
 from functools import reduce
 import operator
+import random
+from typing import Iterable, List
+
+from .utils import Grid
+
+# Grid imports numpy on first use
+HEAVY_IMPORTS = ('numpy',)
+
 
 def parse_input(lines):
-    field = []
-    for line in lines:
-        field.append([c == '#' for c in line.strip()])
-    return field
-
-def trees_on_slope(field, slope):
-    width = len(field[0])
-    pos = 0 + 0j
-    num_trees = 0
-    while True:
-        pos += slope
-        if pos.imag >= len(field):
-            break
-        if field[int(pos.imag)][int(pos.real) % width]:
-            num_trees += 1
-    return num_trees
+    return Grid.from_lines(lines, {'#': 1})
+
+# Cells gathered at once (steps down times residues); bounds the column index block
+STEP_CHUNK = 1 << 16
+
+
+def count_trees(field: Grid, slopes: Iterable[complex]) -> List[int]:
+    import numpy as np
+    slopes = list(slopes)
+    height, width = field.shape
+    if any(slope.imag < 1 for slope in slopes):
+        raise ValueError('Slopes have to go down the field')
+    # The field repeats to the right, so where a slope lands only depends on how far right it
+    # moves modulo the width. Slopes with the same step down and residue share one count.
+    by_down = {}
+    for down in set(int(slope.imag) for slope in slopes):
+        residues = np.array(sorted({int(slope.real) % width for slope in slopes if int(slope.imag) == down}))
+        chunk = max(STEP_CHUNK // len(residues), 1)
+        last = (height - 1) // down + 1
+        totals = np.zeros(len(residues), dtype=np.int64)
+        for start in range(1, last, chunk):
+            steps = np.arange(start, min(start + chunk, last))
+            cols = (steps[None, :] * residues[:, None]) % width
+            totals += field[steps * down, cols].sum(axis=1, dtype=np.int64)
+        by_down[down] = dict(zip(residues.tolist(), totals.tolist()))
+    return [by_down[int(slope.imag)][int(slope.real) % width] for slope in slopes]
+
+def trees_on_slope(field: Grid, slope: complex):
+    return count_trees(field, [slope])[0]
 
 def part1(field):
     return trees_on_slope(field, 3 + 1j)
@@ -30,4 +51,9 @@ def part2(field):
         7 + 1j,
         1 + 2j,
     ]
-    return reduce(operator.mul, (trees_on_slope(field, s) for s in slopes), 1)
\ No newline at end of file
+    return reduce(operator.mul, count_trees(field, slopes), 1)
+
+
+def generate_input(size: int, rng: random.Random) -> List[str]:
+    # size is the number of rows, each the width of the real input
+    return [''.join('#' if rng.random() < 0.25 else '.' for _ in range(31)) + '\n' for _ in range(size)]
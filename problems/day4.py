@@ -1,7 +1,14 @@
+from collections import Counter
+import os
+import random
 import re
-from typing import List, Optional, NamedTuple
+import string
+from typing import Callable, Iterable, List, Optional, NamedTuple, Tuple
 
-from .utils import parse_paragraphs
+from .utils import iter_paragraphs
+
+# Passports are built as their paragraphs go by
+INPUT_MODE = 'stream'
 
 
 def extract_fields(fields: List[str]):
@@ -16,82 +23,198 @@ def parse_par(par: List[List[str]]):
     return extract_fields(field for line in par for field in line)
 
 
-def parse_input(lines: List[str]):
-    return parse_paragraphs(lines, parse_line, parse_par)
+def iter_records(lines: Iterable[str]):
+    return iter_paragraphs(lines, parse_line, parse_par)
+
+
+def parse_input(lines: Iterable[str]):
+    return list(iter_records(lines))
+
 
+REQUIRED_FIELDS = frozenset([
+    'byr',
+    'iyr',
+    'eyr',
+    'hgt',
+    'hcl',
+    'ecl',
+    'pid',
+])
 
 def is_doc_valid_pt1(doc):
-    required_fields = {
-        'byr',
-        'iyr',
-        'eyr',
-        'hgt',
-        'hcl',
-        'ecl',
-        'pid',
-    }
-    return required_fields.issubset(doc.keys())
+    return REQUIRED_FIELDS <= doc.keys()
 
 
 HEIGHT_RE = re.compile(r'^(\d+)(in|cm)$')
 HAIR_COLOR_RE = re.compile(r'^#[\da-f]{6}$')
 PID_RE = re.compile(r'^\d{9}$')
+EYE_COLORS = frozenset(['amb', 'blu', 'brn', 'gry', 'grn', 'hzl', 'oth'])
 
-def doc_validation_pt2(doc):
-    # Check fields exist
-    if not is_doc_valid_pt1(doc):
-        return 'Missing fields'
-
-    byr = int(doc['byr'])
-    iyr = int(doc['iyr'])
-    eyr = int(doc['eyr'])
-    hgt = doc['hgt']
-    hcl = doc['hcl']
-    ecl = doc['ecl']
-    pid = doc['pid']
-
-    # Validate birth year
-    if byr < 1920 or byr > 2002:
-        return f'Birth year {byr} invalid'
-
-    # Validate issue year
-    if iyr < 2010 or iyr > 2020:
-        return f'Issue year {iyr} invalid'
-
-    # Validate expiry year
-    if eyr < 2020 or eyr > 2030:
-        return f'Expiry year {eyr} invalid'
-
-    # Validate height
-    m = HEIGHT_RE.match(hgt)
+
+def year_between(low: int, high: int) -> Callable[[str], bool]:
+    def check(value: str) -> bool:
+        # Anything that isn't a number isn't a valid year either
+        try:
+            return low <= int(value) <= high
+        except ValueError:
+            return False
+    return check
+
+
+def is_height_valid(value: str) -> bool:
+    m = HEIGHT_RE.match(value)
     if not m:
         return False
     height_val = int(m.group(1))
-    height_unit = m.group(2)
-    if height_unit == 'cm' and (height_val < 150 or height_val > 193):
-        return f'Height {height_val} in cm invalid'
-    elif height_unit == 'in' and (height_val < 59 or height_val > 76):
-        return f'Height {height_val} in in invalid'
+    if m.group(2) == 'cm':
+        return 150 <= height_val <= 193
+    return 59 <= height_val <= 76
+
+
+class Rule(NamedTuple):
+    field: str
+    description: str
+    check: Callable[[str], bool]
+
 
-    # Validate hair colour
-    if not HAIR_COLOR_RE.match(hcl):
-        return f'Hair color {hcl} invalid'
+# In the order they're checked; a document's first failure is the one it's counted against
+RULES = [
+    Rule('byr', 'Birth year', year_between(1920, 2002)),
+    Rule('iyr', 'Issue year', year_between(2010, 2020)),
+    Rule('eyr', 'Expiry year', year_between(2020, 2030)),
+    Rule('hgt', 'Height', is_height_valid),
+    Rule('hcl', 'Hair color', lambda v: HAIR_COLOR_RE.match(v) is not None),
+    Rule('ecl', 'Eye color', lambda v: v in EYE_COLORS),
+    Rule('pid', 'Passport id', lambda v: PID_RE.match(v) is not None),
+]
 
-    # Validate eye colour
-    if ecl not in {'amb', 'blu', 'brn', 'gry', 'grn', 'hzl', 'oth'}:
-        return f'Eye color {ecl} invalid'
+MISSING_FIELDS = 'missing'
 
-    # Validate passport id
-    if not PID_RE.match(pid):
-        return f'Passport id {pid} invalid'
 
+def first_failed_rule(doc) -> Optional[str]:
+    # The field of the first rule a document fails, MISSING_FIELDS, or None if it's valid
+    if not is_doc_valid_pt1(doc):
+        return MISSING_FIELDS
+    for rule in RULES:
+        if not rule.check(doc[rule.field]):
+            return rule.field
     return None
 
 
+def is_doc_valid_pt2(doc) -> bool:
+    return first_failed_rule(doc) is None
+
+
 def part1(documents):
     return sum(is_doc_valid_pt1(d) for d in documents)
     
 
 def part2(documents):
-    results = [doc_validation_pt2(d) for d in documents]
-    return sum(r == None for r in results)
\ No newline at end of file
+    return sum(is_doc_valid_pt2(d) for d in documents)
+
+
+# ---------------
+
+
+def shard_bounds(path: str, shards: int) -> List[Tuple[int, int]]:
+    # Byte ranges of roughly equal size that each start just after a blank line,
+    # so no passport is split between shards
+    size = os.path.getsize(path)
+    starts = [0]
+    with open(path, 'rb') as f:
+        for i in range(1, shards):
+            f.seek(max(size * i // shards, starts[-1]))
+            # Finish the line we landed in, then look for the next blank one
+            f.readline()
+            while True:
+                line = f.readline()
+                if line == b'' or line.strip() == b'':
+                    break
+            starts.append(f.tell())
+    return list(zip(starts, starts[1:] + [size]))
+
+
+def read_shard(path: str, start: int, end: int):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        pos = start
+        for line in f:
+            if pos >= end:
+                break
+            pos += len(line)
+            yield line.decode()
+
+
+def validate_shard(path: str, start: int, end: int, histogram: bool) -> Counter:
+    # With histogram, counts documents by the rule they fail first (None for valid ones);
+    # otherwise just counts the valid ones, under None
+    counts = Counter()
+    for doc in iter_records(read_shard(path, start, end)):
+        if not doc:
+            # Each extra blank line (such as trailing ones) reads as an empty paragraph
+            continue
+        if histogram:
+            counts[first_failed_rule(doc)] += 1
+        elif is_doc_valid_pt2(doc):
+            counts[None] += 1
+    return counts
+
+
+def validate_file(path: str, workers: int = 1, histogram: bool = False) -> Counter:
+    bounds = shard_bounds(path, workers)
+    if workers == 1:
+        return validate_shard(path, *bounds[0], histogram)
+    from concurrent.futures import ProcessPoolExecutor
+    counts = Counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(validate_shard, path, start, end, histogram) for start, end in bounds]
+        for future in futures:
+            counts.update(future.result())
+    return counts
+
+
+def generate_field(field: str, rng: random.Random) -> str:
+    # Mostly valid values, with enough invalid ones to exercise every check
+    if field == 'byr':
+        return str(rng.randint(1900, 2010))
+    elif field == 'iyr':
+        return str(rng.randint(2005, 2025))
+    elif field == 'eyr':
+        return str(rng.randint(2015, 2035))
+    elif field == 'hgt':
+        return rng.choice([f'{rng.randint(140, 200)}cm', f'{rng.randint(50, 80)}in', str(rng.randint(50, 200))])
+    elif field == 'hcl':
+        return rng.choice(['#', '']) + ''.join(rng.choice('0123456789abcdef') for _ in range(6))
+    elif field == 'ecl':
+        return rng.choice(['amb', 'blu', 'brn', 'gry', 'grn', 'hzl', 'oth', 'xyz'])
+    elif field == 'pid':
+        return ''.join(rng.choice(string.digits) for _ in range(rng.choice([9, 9, 9, 10])))
+    else:
+        return str(rng.randint(1, 999))
+
+
+def generate_input(size: int, rng: random.Random) -> List[str]:
+    all_fields = ['byr', 'iyr', 'eyr', 'hgt', 'hcl', 'ecl', 'pid', 'cid']
+    lines = []
+    for _ in range(size):
+        fields = [f for f in all_fields if rng.random() < 0.9]
+        rng.shuffle(fields)
+        pairs = [f'{f}:{generate_field(f, rng)}' for f in fields]
+        split = rng.randint(0, len(pairs))
+        # A passport is split over one or two lines, never with a blank line inside it
+        lines.extend(' '.join(half) + '\n' for half in (pairs[:split], pairs[split:]) if len(half) > 0)
+        lines.append('\n')
+    return lines
+
+
+
+if __name__ == '__main__':
+    # Validates a passport file across worker processes: python -m problems.day4 FILE [WORKERS]
+    import sys
+    counts = validate_file(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count(), histogram=True)
+    print(f'{counts[None]} valid of {sum(counts.values())}')
+    descriptions = {rule.field: f'{rule.description} invalid' for rule in RULES}
+    descriptions[MISSING_FIELDS] = 'Missing fields'
+    for failed, count in counts.most_common():
+        if failed is not None:
+            print(f'  {descriptions[failed]}: {count}')
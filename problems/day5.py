@@ -1,68 +1,91 @@
-from typing import Dict, List, NamedTuple, Set
+import random
+from typing import TYPE_CHECKING, List, Optional
 
-class Pass(NamedTuple):
-    row_bsp: List[bool]
-    col_bsp: List[bool]
+if TYPE_CHECKING:
+    # numpy is only imported when parsing
+    import numpy as np
 
 
-def bsp_char_to_bool(c: str) -> bool:
-    return c == 'B' or c == 'R'
+# Passes are decoded straight out of the mapped file
+INPUT_MODE = 'mmap'
 
+HEAVY_IMPORTS = ('numpy',)
 
-def parse_input(lines):
-    res = []
-    for line in lines:
-        row_bsp = list(bsp_char_to_bool(c) for c in line.strip()[0:7])
-        col_bsp = list(bsp_char_to_bool(c) for c in line.strip()[7:])
-        res.append(Pass(row_bsp, col_bsp))
-    return res
+# The row and column together are one binary number, row * 8 + col, which is the seat id
+SEAT_BITS = str.maketrans('FBLR', '0101')
+SEAT_COUNT = 1 << 10
 
 
-def resolve_bsp(bsp: List[bool], lower: int, upper: int):
-    search_range = upper - lower
+def decode_seat(code: str) -> int:
+    return int(code.translate(SEAT_BITS), 2)
 
-    if len(bsp) == 0:
-        # End of specification
-        # We're assuming out bsp was complete here
-        return lower
-    if bsp[0]:
-        # Upper half
-        return resolve_bsp(bsp[1:], lower + search_range // 2, upper)
-    else:
-        # Lower half
-        return resolve_bsp(bsp[1:], lower, lower + search_range // 2)
 
+def decode_seats_bulk(data: 'np.ndarray', width: int) -> Optional['np.ndarray']:
+    # data holds lines of exactly width characters, each followed by a newline. Returns None unless
+    # they're all F, B, L or R, so anything else (such as a '\r' before the newline) is left to
+    # the line at a time decoding.
+    import numpy as np
+    codes = data.reshape(-1, width + 1)[:, :width]
+    ones = (codes == ord('B')) | (codes == ord('R'))
+    if not (ones | (codes == ord('F')) | (codes == ord('L'))).all():
+        return None
+    return ones.astype(np.int64) @ (1 << np.arange(width - 1, -1, -1))
 
-def resolve_seat(p: Pass) -> complex:
-    row = resolve_bsp(p.row_bsp, 0, 2**len(p.row_bsp))
-    col = resolve_bsp(p.col_bsp, 0, 2**len(p.col_bsp))
-    return complex(row, col)
 
+def decode_seats(buffer) -> 'np.ndarray':
+    import numpy as np
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    if len(data) == 0:
+        return np.zeros(0, dtype=np.int64)
+    if data[-1] != ord('\n'):
+        data = np.append(data, np.uint8(ord('\n')))
+    width = int(np.argmax(data == ord('\n')))
+    if width > 0 and len(data) % (width + 1) == 0 and (data[width::width + 1] == ord('\n')).all():
+        seat_ids = decode_seats_bulk(data, width)
+        if seat_ids is not None:
+            return seat_ids
+    # Ragged or untidy lines go through one pass at a time
+    return np.array([decode_seat(code) for code in bytes(buffer).decode().split()], dtype=np.int64)
 
-def seat_id(seat: complex) -> int:
-    return int(8 * seat.real + seat.imag)
 
+def parse_input(buffer) -> 'np.ndarray':
+    seat_ids = decode_seats(buffer)
+    if len(seat_ids) > 0 and seat_ids.max() >= SEAT_COUNT:
+        raise ValueError(f'Seat id {int(seat_ids.max())} is past the last seat')
+    return seat_ids
 
-def part1(passes):
-    resolved = [resolve_seat(p) for p in passes]
-    return max(seat_id(s) for s in resolved)
 
+def part1(seat_ids: 'np.ndarray'):
+    return int(seat_ids.max())
 
-def find_lone_missing_seat(seat_ids: Set[int]) -> int:
-    # Add -1 as an initial so we can catch missing seats at the start
-    seats = [-1]
-    seats.extend(sorted(seat_ids))
 
-    for i in range(1, len(seats)):
-        cur = seats[i]
-        prev = seats[i - 1]
-        missing_range = cur - prev - 1
-        if prev != -1 and missing_range == 1:
-            # Bingo, exactly one missing seat
-            return cur - 1
-    
-    return None
+def find_lone_missing_seat(seat_ids: 'np.ndarray') -> Optional[int]:
+    import numpy as np
+    # Occupancy bitmap with an empty seat either side, so the first and last seats need no special case
+    occupied = np.zeros(SEAT_COUNT + 2, dtype=bool)
+    occupied[seat_ids + 1] = True
+    lone = np.flatnonzero(~occupied[1:-1] & occupied[:-2] & occupied[2:])
+    return int(lone[0]) if len(lone) > 0 else None
 
 
-def part2(passes):
-    return find_lone_missing_seat(set(seat_id(resolve_seat(p)) for p in passes))
\ No newline at end of file
+def part2(seat_ids: 'np.ndarray'):
+    return find_lone_missing_seat(seat_ids)
+
+
+def encode_seat(seat: int) -> str:
+    row = format(seat // 8, '07b').replace('0', 'F').replace('1', 'B')
+    col = format(seat % 8, '03b').replace('0', 'L').replace('1', 'R')
+    return row + col
+
+
+def generate_input(size: int, rng: random.Random) -> List[str]:
+    # A contiguous block of seats with one missing from the middle. There are only 1024 seats,
+    # so bigger manifests repeat passes. The missing seat needs a pass either side, so there are
+    # always at least two.
+    block = min(max(size, 2) + 1, 1024)
+    start = rng.randint(0, 1024 - block)
+    missing = rng.randint(start + 1, start + block - 2)
+    seats = [s for s in range(start, start + block) if s != missing]
+    passes = seats + [rng.choice(seats) for _ in range(size - len(seats))]
+    rng.shuffle(passes)
+    return [f'{encode_seat(s)}\n' for s in passes]
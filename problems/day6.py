@@ -1,26 +1,76 @@
-from functools import reduce
-from typing import List, Set
+from dataclasses import dataclass
+import random
+import string
+from typing import TYPE_CHECKING, List
 
-from .utils import parse_paragraphs
+if TYPE_CHECKING:
+    # numpy is only imported when parsing
+    import numpy as np
 
 
-def parse_line_func(line):
-    return {c for c in line.strip()}
+# Answers are read straight out of the mapped file into bitmasks
+INPUT_MODE = 'mmap'
 
+HEAVY_IMPORTS = ('numpy',)
 
-def parse_input(lines):
-    return parse_paragraphs(lines, parse_line_func)
 
+@dataclass
+class Groups:
+    # One 26-bit mask of answered questions per person, bit 0 for 'a'
+    answers: 'np.ndarray'
+    # Where each group's people start in answers
+    offsets: 'np.ndarray'
 
-def part1(groups: List[Set[str]]):
-    answered_qs = []
-    for group in groups:
-        answered_qs.append(reduce(lambda acc, s: acc.union(s), group))
-    return sum(len(a) for a in answered_qs)
 
+def parse_input(buffer) -> Groups:
+    import numpy as np
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    if len(data) == 0 or data[-1] != ord('\n'):
+        data = np.append(data, np.uint8(ord('\n')))
+    newlines = data == ord('\n')
+    # Each byte's line number, with a newline counted as the end of its own line
+    line_of = np.cumsum(newlines) - newlines
+    letters = (data >= ord('a')) & (data <= ord('z'))
+    masks = np.zeros(np.count_nonzero(newlines), dtype=np.uint32)
+    bits = np.left_shift(np.uint32(1), data[letters] - ord('a'), dtype=np.uint32)
+    np.bitwise_or.at(masks, line_of[letters], bits)
 
-def part2(groups):
-    answered_qs = []
-    for group in groups:
-        answered_qs.append(reduce(lambda acc, s: acc.intersection(s), group))
-    return sum(len(a) for a in answered_qs)
\ No newline at end of file
+    # Lines without answers separate the groups
+    answered = masks != 0
+    starts_group = answered & ~np.concatenate(([False], answered[:-1]))
+    return Groups(answers=masks[answered], offsets=np.flatnonzero(starts_group[answered]))
+
+
+def count_bits(masks: 'np.ndarray') -> int:
+    import numpy as np
+    if hasattr(np, 'bitwise_count'):
+        return int(np.bitwise_count(masks).sum())
+    # bitwise_count is new in numpy 2.0; before that, count the bits of each byte
+    return int(np.unpackbits(np.ascontiguousarray(masks).view(np.uint8)).sum())
+
+
+def count_answers(groups: Groups, reduce_group) -> int:
+    if len(groups.offsets) == 0:
+        return 0
+    return count_bits(reduce_group.reduceat(groups.answers, groups.offsets))
+
+
+def part1(groups: Groups):
+    # Questions anyone in the group answered
+    import numpy as np
+    return count_answers(groups, np.bitwise_or)
+
+
+def part2(groups: Groups):
+    # Questions everyone in the group answered
+    import numpy as np
+    return count_answers(groups, np.bitwise_and)
+
+
+def generate_input(size: int, rng: random.Random) -> List[str]:
+    lines = []
+    for _ in range(size):
+        for _ in range(rng.randint(1, 5)):
+            lines.append(''.join(rng.sample(string.ascii_lowercase, rng.randint(1, 26))) + '\n')
+        lines.append('\n')
+    return lines[:-1]
@@ -1,11 +1,16 @@
 from dataclasses import dataclass
+import random
 import re
-from typing import List, Tuple
-
-import networkx as nx
+from typing import TYPE_CHECKING, List, Tuple
 
 from .utils import parse_lines_regex
 
+if TYPE_CHECKING:
+    # networkx is slow to import, so it's only imported when parsing
+    import networkx as nx
+
+HEAVY_IMPORTS = ('networkx',)
+
 BAG_RE = re.compile(r'^(\w+) (\w+) bags?$')
 
 @dataclass(frozen=True)
@@ -33,6 +38,7 @@ def build_object_with_num(raw: str) -> Tuple[Bag, int]:
 
 
 def parse_input(lines):
+    import networkx as nx
     g = nx.DiGraph()
     for line in lines:
         clauses = line.strip().split(' contain ')
@@ -49,11 +55,12 @@ def parse_input(lines):
     return g
 
 
-def part1(g: nx.DiGraph):
+def part1(g: 'nx.DiGraph'):
+    import networkx as nx
     source_paths = [list(nx.all_simple_paths(g, source, SHINY_GOLD_BAG)) for source in g.nodes]
     return sum(len(s) > 0 for s in source_paths)
 
-def get_total_bags(g: nx.DiGraph(), node: Bag):
+def get_total_bags(g: 'nx.DiGraph', node: Bag):
     # One for this bag
     count = 1
     for neighbour in g.adj[node]:
@@ -62,6 +69,30 @@ def get_total_bags(g: nx.DiGraph(), node: Bag):
     return count
 
 
-def part2(g: nx.DiGraph):
+def part2(g: 'nx.DiGraph'):
     # Subtract one for the shiny gold bag itself
-    return get_total_bags(g, SHINY_GOLD_BAG) - 1
\ No newline at end of file
+    return get_total_bags(g, SHINY_GOLD_BAG) - 1
+
+
+ADJECTIVES = ['wavy', 'drab', 'pale', 'faded', 'mirrored', 'muted', 'vibrant', 'dotted', 'light', 'dark', 'clear', 'striped']
+COLORS = ['bronze', 'indigo', 'olive', 'white', 'magenta', 'cyan', 'crimson', 'teal', 'orange', 'black', 'purple', 'tan']
+
+
+def generate_input(size: int, rng: random.Random) -> List[str]:
+    # Bags only contain bags further down the list, so the rules always form a DAG
+    names = [f'{ADJECTIVES[i % len(ADJECTIVES)]}{i // len(ADJECTIVES)} {COLORS[rng.randrange(len(COLORS))]}'
+             for i in range(size)]
+    names[size // 2] = 'shiny gold'
+    lines = []
+    for i, name in enumerate(names):
+        later = range(i + 1, min(size, i + 20))
+        contents = rng.sample(later, min(len(later), rng.randint(0, 2)))
+        if len(contents) == 0:
+            lines.append(f'{name} bags contain no other bags.\n')
+            continue
+        clauses = []
+        for j in contents:
+            n = rng.randint(1, 3)
+            clauses.append(f'{n} {names[j]} bag{"s" if n > 1 else ""}')
+        lines.append(f'{name} bags contain {", ".join(clauses)}.\n')
+    return lines
@@ -1,11 +1,15 @@
 from dataclasses import dataclass
+import random
 import re
 from typing import List, Set
 
-from .utils import parse_lines_regex
+from .utils import iter_buffer_regex, metrics
 
+# One finditer over the mapped file, rather than a match per line
+INPUT_MODE = 'mmap'
 
-INSTRUCTION_RE = re.compile(r'(\w+) ([+\-]\d+)')
+
+INSTRUCTION_RE = re.compile(rb'^[ \t]*(\w+) ([+\-]\d+)[ \t\r]*$', re.MULTILINE)
 
 
 @dataclass
@@ -25,11 +29,11 @@ class ProgramState:
 
 
 def construct_instruction(m: re.Match):
-    return Instruction(m.group(1), int(m.group(2)))
+    return Instruction(m.group(1).decode(), int(m.group(2)))
 
 
-def parse_input(lines):
-    return parse_lines_regex(lines, INSTRUCTION_RE, construct_instruction)
+def parse_input(buffer):
+    return list(iter_buffer_regex(buffer, INSTRUCTION_RE, construct_instruction))
 
 
 # ---------------
@@ -43,6 +47,8 @@ def execute_instruction(state: ProgramState):
     instr = state.current_instruction()
     if instr is None:
         return
+    if metrics.enabled:
+        metrics.count('instructions')
     if instr.operation == 'acc':
         state.accumulator += instr.arg
         state.pc += 1
@@ -84,4 +90,18 @@ def part2(program):
         if result.pc >= len(program):
             resulting_acc = result.accumulator
     
-    return resulting_acc
\ No newline at end of file
+    return resulting_acc
+
+
+def generate_input(size: int, rng: random.Random) -> List[str]:
+    # Straight-line acc/nop code ending in a jump back to the start, so only flipping the final
+    # jmp terminates. The nops jump forward short of the end when flipped, so every flip
+    # runs most of the program before looping.
+    lines = []
+    for i in range(size - 1):
+        if rng.random() < 0.5:
+            lines.append(f'acc {rng.randint(-50, 50):+d}\n')
+        else:
+            lines.append(f'nop {rng.randint(0, max(0, size - 2 - i)):+d}\n')
+    lines.append(f'jmp {-(size - 1):+d}\n')
+    return lines
@@ -1,5 +1,9 @@
+import random
 from typing import Dict, List, Set
 
+# One number per line, read as it's parsed
+INPUT_MODE = 'stream'
+
 def parse_input(lines):
     return [int(line.strip()) for line in lines]
 
@@ -63,4 +67,31 @@ def part2(nums):
     sums = cum_sums(nums)
     (i, j) = find_indices_which_sum_to(sums, first_nonsum)
     return min(nums[i:j+1]) + max(nums[i:j+1])
-    
+
+
+def generate_input(size: int, rng: random.Random) -> List[str]:
+    # Picking pairs whose sum stays small (with negatives allowed) stops the values growing
+    # exponentially. The last number isn't a sum of its preamble but is the sum of a
+    # contiguous run late in the list, so part2 has to search most of it.
+    preamble_size = 25
+    bound = 10 ** 6
+    nums = [rng.randint(-bound, bound) for _ in range(preamble_size)]
+    while len(nums) < size - 1:
+        window = nums[-preamble_size:]
+        best = None
+        for _ in range(50):
+            x, y = rng.sample(window, 2)
+            if best is None or abs(x + y) < abs(best):
+                best = x + y
+            if abs(best) <= bound:
+                break
+        nums.append(best)
+
+    window = nums[-preamble_size:]
+    pair_sums = {x + y for x in window for y in window}
+    while True:
+        lower = rng.randrange(3 * len(nums) // 4, len(nums) - 2)
+        target = sum(nums[lower:lower + rng.randint(2, 4)])
+        if target not in pair_sums:
+            break
+    return [f'{n}\n' for n in [preamble_size] + nums + [target]]
@@ -1,38 +1,175 @@
+from collections import Counter
+from contextlib import nullcontext
+from itertools import product
 import re
+import timeit
+from typing import Dict, Iterable, Tuple
 
 
 def identity(x):
     return x
 
 
-def parse_paragraphs(lines, transform_line=None, transform_par=None):
+def iter_paragraphs(lines, transform_line=None, transform_par=None):
     # Optional transform functions
     if transform_line is None:
         transform_line = identity
     if transform_par is None:
         transform_par = identity
 
-    pars = []
     cur_par = []
     for line in lines:
         if line.strip() == '':
-            pars.append(transform_par(cur_par))
+            yield transform_par(cur_par)
             cur_par = []
         else:
             cur_par.append(transform_line(line.strip()))
     if len(cur_par) > 0:
-        pars.append(transform_par(cur_par))
-    return pars
+        yield transform_par(cur_par)
 
 
-def parse_lines_regex(lines, regex: re.Pattern, transform_match=None):
+def parse_paragraphs(lines, transform_line=None, transform_par=None):
+    return list(iter_paragraphs(lines, transform_line, transform_par))
+
+
+def default_transform_match(m: re.Match):
+    # Return match groups as a tuple by default
+    return m.groups()
+
+
+def iter_lines_regex(lines, regex: re.Pattern, transform_match=None):
     if transform_match is None:
-        # Return match groups as a tuple by default
-        transform_match = lambda m: m.groups()
-    results = []
+        transform_match = default_transform_match
     for line in lines:
         m = regex.match(line.strip())
         if not m:
             raise ValueError(f'Failed to match {line}')
-        results.append(transform_match(m))
-    return results
\ No newline at end of file
+        yield transform_match(m)
+
+
+def parse_lines_regex(lines, regex: re.Pattern, transform_match=None):
+    return list(iter_lines_regex(lines, regex, transform_match))
+
+
+def check_gap(gap):
+    # Only blank lines may sit between matches, or a line would be silently skipped
+    if gap.strip():
+        raise ValueError(f'Failed to match {gap.strip().splitlines()[0]}')
+
+
+def iter_buffer_regex(buffer, regex: re.Pattern, transform_match=None):
+    # Matches a whole buffer (str, bytes or mmap) in one finditer rather than one line at a time.
+    # The regex has to be compiled with re.MULTILINE and anchored to match a whole line. Lines aren't
+    # stripped first, so the regex should allow for surrounding blanks and a '\r' before the newline.
+    if transform_match is None:
+        transform_match = default_transform_match
+    pos = 0
+    for m in regex.finditer(buffer):
+        # Whole-line matches are at least a newline apart, so anything shorter is fine as is
+        if m.start() - pos > 1:
+            check_gap(buffer[pos:m.start()])
+        yield transform_match(m)
+        pos = m.end()
+    check_gap(buffer[pos:])
+
+
+class Grid:
+    # An N-dimensional grid of small integer cell codes, backed by a numpy uint8 array.
+    # numpy is imported on first use, so problems that don't use grids don't pay for it.
+
+    def __init__(self, cells):
+        self.cells = cells
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[str], codes: Dict[str, int]) -> 'Grid':
+        # codes maps each character to its cell code; the rows must all be the same width
+        import numpy as np
+        rows = [line.strip() for line in lines if line.strip() != '']
+        table = np.zeros(256, dtype=np.uint8)
+        for c, code in codes.items():
+            table[ord(c)] = code
+        raw = np.frombuffer(''.join(rows).encode('ascii'), dtype=np.uint8)
+        return cls(table[raw.reshape(len(rows), -1)])
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self.cells.shape
+
+    def __getitem__(self, key):
+        return self.cells[key]
+
+    def __eq__(self, other) -> bool:
+        import numpy as np
+        return isinstance(other, Grid) and np.array_equal(self.cells, other.cells)
+
+    def changed(self, other: 'Grid') -> bool:
+        return not self == other
+
+    def count(self, code: int) -> int:
+        import numpy as np
+        return int(np.count_nonzero(self.cells == code))
+
+    def with_dims(self, ndim: int) -> 'Grid':
+        # Adds leading axes of size 1, so a 2D slice can become the middle of a 3D or 4D grid
+        return Grid(self.cells.reshape((1,) * (ndim - self.cells.ndim) + self.cells.shape))
+
+    def pad(self, width: int = 1) -> 'Grid':
+        import numpy as np
+        return Grid(np.pad(self.cells, width))
+
+    def neighbour_counts(self, code: int, wrap: bool = False):
+        # For every cell, how many of its 3^N - 1 neighbours hold code. Off the edge counts as
+        # empty, unless wrap joins each axis end to end.
+        import numpy as np
+        matches = (self.cells == code).astype(np.uint8)
+        counts = np.zeros(self.shape, dtype=np.uint8)
+        offsets = [o for o in product((-1, 0, 1), repeat=matches.ndim) if any(o)]
+        if wrap:
+            for offset in offsets:
+                counts += np.roll(matches, offset, axis=tuple(range(matches.ndim)))
+            return counts
+        padded = np.pad(matches, 1)
+        for offset in offsets:
+            counts += padded[tuple(slice(1 + o, 1 + o + n) for o, n in zip(offset, self.shape))]
+        return counts
+
+
+class Timer:
+    def __init__(self, metrics: 'Metrics', name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = timeit.default_timer()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.timers[self.name] += timeit.default_timer() - self.start
+
+
+class Metrics:
+    # Named counters and timers for hot paths, collected by the harness with --counters.
+    # Guard each use with `if metrics.enabled:` so that it costs one attribute lookup
+    # when nothing's collecting.
+
+    def __init__(self):
+        self.enabled = False
+        self.counters = Counter()
+        self.timers = Counter()
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] += n
+
+    def timer(self, name: str):
+        # Safe to use unguarded outside hot loops, since it does nothing when disabled
+        return Timer(self, name) if self.enabled else nullcontext()
+
+    def reset(self):
+        self.counters.clear()
+        self.timers.clear()
+
+    def snapshot(self):
+        return {**self.counters, **{f'{name} (s)': t for name, t in self.timers.items()}}
+
+
+metrics = Metrics()